@@ -0,0 +1,46 @@
+"""add product search
+
+Revision ID: 3f9a0c7d5e12
+Revises: 8e41b6d0c2a7
+Create Date: 2026-10-18 11:40:51.730214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a0c7d5e12'
+down_revision: Union[str, None] = '8e41b6d0c2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.add_column('products', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_products_name_trgm', 'products', ['name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(op.f('ix_products_category_id'), 'products', ['category_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_products_category_id'), table_name='products')
+    op.drop_index('ix_products_name_trgm', table_name='products')
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
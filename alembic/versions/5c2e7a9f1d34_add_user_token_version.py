@@ -0,0 +1,26 @@
+"""add user token version
+
+Revision ID: 5c2e7a9f1d34
+Revises: d1d990edeee2
+Create Date: 2026-10-18 10:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e7a9f1d34'
+down_revision: Union[str, None] = 'd1d990edeee2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
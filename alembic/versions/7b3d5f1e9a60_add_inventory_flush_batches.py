@@ -0,0 +1,30 @@
+"""add inventory flush batches
+
+Revision ID: 7b3d5f1e9a60
+Revises: 3f9a0c7d5e12
+Create Date: 2026-10-18 20:14:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d5f1e9a60'
+down_revision: Union[str, None] = '3f9a0c7d5e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('inventory_flush_batches',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('applied_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('inventory_flush_batches')
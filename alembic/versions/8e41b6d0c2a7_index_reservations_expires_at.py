@@ -0,0 +1,26 @@
+"""index reservations expires_at
+
+Revision ID: 8e41b6d0c2a7
+Revises: 5c2e7a9f1d34
+Create Date: 2026-10-18 11:02:15.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41b6d0c2a7'
+down_revision: Union[str, None] = '5c2e7a9f1d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_reservations_expires_at'), 'reservations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reservations_expires_at'), table_name='reservations')
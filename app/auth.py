@@ -1,22 +1,47 @@
+import time
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 
+from app.config import TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL
+from app.exceptions import EntityNotFoundException
+from app.services.local_cache import LocalCache
 from app.services.user_service import UserService
-from app.database.database import get_db
+from app.database.database import get_read_db
 from app.utils import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+# Verified claims per raw token, so repeat requests skip the JWT signature check
+token_cache = LocalCache(TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL)
+
+
+def get_token_claims(token: str) -> dict:
+    """Decode a token once and reuse its claims until it expires."""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_access_token(token)
+        lifetime = payload.get("exp", 0) - time.time()
+        if lifetime > 0:
+            token_cache.set(token, payload, ttl=min(lifetime, TOKEN_CACHE_TTL))
+    elif payload.get("exp", 0) <= time.time():
+        token_cache.delete(token)
+        payload = decode_access_token(token)
+    return payload
+
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_read_db)):
     """Retrieve the current authenticated user."""
-    payload = decode_access_token(token)
+    payload = get_token_claims(token)
     id: str = payload.get("sub")
     if not id:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
     service = UserService(db)
-    user = await service.get_one(int(id))
-    if not user:
+    try:
+        user = await service.get_one(int(id))
+    except EntityNotFoundException:
         raise HTTPException(status_code=401, detail="User not found")
+    if user["token_version"] != payload.get("ver", 0):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
     return user
@@ -0,0 +1,304 @@
+"""
+Bulk-load a synthetic dataset for scale testing.
+
+Rows are generated in partitions, each from its own ``random.Random`` derived
+from ``--seed``, table and partition number, so the data is identical for a
+given seed no matter how many ``--jobs`` load it in parallel. Every table is
+written with asyncpg's binary COPY, using the table and column definitions
+of the SQLAlchemy models, and the ID sequences are moved past the loaded
+rows afterwards so the API keeps inserting normally.
+
+    python -m app.cli.seed --truncate --products 1000000 --users 500000 \\
+        --orders 3000000 --jobs 8
+
+Distributions:
+    products      Zipfian popularity (``--product-skew``); popular products
+                  are scattered over the ID range rather than the first IDs
+    orders        Zipfian orders per user (``--user-skew``), one to
+                  ``--max-items`` items each, small orders being most common
+    reservations  ``--expired-ratio`` of them already past ``expires_at``,
+                  the rest expiring within the next 30 minutes; the units
+                  they hold are taken out of ``products.quantity``, so the
+                  reservation sweeper returns stock that was really taken
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List
+
+import asyncpg
+
+from app.config import DEFAULT_USER, DEFAULT_PASSWORD, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_DB
+from app.models import (
+    CategoryModel, UserModel, ProductModel, OrderModel, OrderItemModel, ReservationModel,
+)
+from app.utils import hash_password
+
+# Rows generated and sent per COPY; also the unit of work handed to a job
+PARTITION_SIZE = 100_000
+
+WORDS = (
+    "red blue green black white steel wooden organic wireless cotton leather "
+    "classic smart light heavy compact portable premium eco pro mini max ultra"
+).split()
+NOUNS = (
+    "chair lamp desk phone charger kettle backpack jacket shoe watch speaker "
+    "headphones mug bottle notebook pen blanket pillow router camera"
+).split()
+
+
+class Zipf:
+    def __init__(self, count: int, skew: float, rng: random.Random):
+        """
+        Draws IDs 1..count with Zipfian probability.
+
+        Rank ``k`` has weight ``1 / k ** skew``; ranks are shuffled onto IDs
+        so the most popular rows aren't simply the lowest IDs.
+        Attributes:
+            ids (List[int]): ID for each popularity rank.
+            cum_weights (List[float]): Running total of the rank weights.
+        """
+        self.ids = list(range(1, count + 1))
+        rng.shuffle(self.ids)
+        self.cum_weights = list(
+            itertools.accumulate(1 / rank ** skew for rank in range(1, count + 1))
+        )
+
+    def sample(self, rng: random.Random) -> int:
+        index = bisect.bisect(self.cum_weights, rng.random() * self.cum_weights[-1])
+        return self.ids[min(index, len(self.ids) - 1)]
+
+
+class Seeder:
+    def __init__(self, args):
+        """
+        Generates the rows of every table for one set of command line options.
+        Attributes:
+            args (argparse.Namespace): Parsed command line options.
+            now (datetime): Reference time for reservation expiry.
+            prices (List[float]): Price per product ID (index 0 unused), so
+                order items can record the price at order time.
+            reserved (List[int]): Units held by reservations per product ID
+                (index 0 unused), filled in by ``plan_reservations``.
+        """
+        self.args = args
+        self.now = datetime.utcnow()
+        prices = self.rng("prices")
+        self.prices = [0.0] + [
+            round(prices.lognormvariate(3.5, 1.0), 2) for _ in range(args.products)
+        ]
+        self.popularity = Zipf(args.products, args.product_skew, self.rng("popularity"))
+        self.buyers = Zipf(args.users, args.user_skew, self.rng("buyers"))
+        self.password = hash_password(args.password)
+        self.reserved = [0] * (args.products + 1)
+
+    def rng(self, *parts) -> random.Random:
+        return random.Random(":".join(str(part) for part in (self.args.seed, *parts)))
+
+    def categories(self, start: int, stop: int) -> Iterator[tuple]:
+        for id in range(start, stop):
+            yield id, f"Category {id}"
+
+    def users(self, start: int, stop: int) -> Iterator[tuple]:
+        for id in range(start, stop):
+            yield id, f"user{id}", f"user{id}@example.com", self.password, 0
+
+    def products(self, start: int, stop: int) -> Iterator[tuple]:
+        rng = self.rng("products", start)
+        for id in range(start, stop):
+            name = f"{' '.join(rng.sample(WORDS, 2)).title()} {rng.choice(NOUNS).title()}"
+            description = " ".join(rng.choices(WORDS + NOUNS, k=rng.randint(8, 24)))
+            # A few products are sold out
+            stock = 0 if rng.random() < 0.05 else rng.randint(1, 1000)
+            # Reservations hold part of the stock; a product reserved beyond
+            # what it had is left sold out
+            quantity = max(stock, self.reserved[id]) - self.reserved[id]
+            yield (
+                id, name, description, self.prices[id], quantity,
+                rng.randint(1, self.args.categories),
+            )
+
+    def orders(self, start: int, stop: int) -> Iterator[tuple]:
+        rng = self.rng("orders", start)
+        for id in range(start, stop):
+            yield id, self.buyers.sample(rng)
+
+    def order_items(self, start: int, stop: int) -> Iterator[tuple]:
+        """Items of orders ``start..stop``; item IDs follow from the item counts."""
+        counts = self.item_counts(start, stop)
+        item_id = self.first_item_ids[start // PARTITION_SIZE]
+        rng = self.rng("order_items", start)
+        for order_id, count in zip(range(start, stop), counts):
+            for product_id in self.distinct_products(rng, count):
+                yield (
+                    item_id, order_id, product_id, rng.randint(1, 3), self.prices[product_id]
+                )
+                item_id += 1
+
+    def reservations(self, start: int, stop: int) -> Iterator[tuple]:
+        rng = self.rng("reservations", start)
+        for id in range(start, stop):
+            if rng.random() < self.args.expired_ratio:
+                expires_at = self.now - timedelta(seconds=rng.randint(1, 86400))
+            else:
+                expires_at = self.now + timedelta(seconds=rng.randint(1, 1800))
+            yield (
+                id, self.buyers.sample(rng), self.popularity.sample(rng),
+                rng.randint(1, 3), expires_at,
+            )
+
+    def item_counts(self, start: int, stop: int) -> List[int]:
+        # Geometric-ish: each extra item half as likely as the one before
+        rng = self.rng("item_counts", start)
+        counts = []
+        for _ in range(start, stop):
+            count = 1
+            while count < self.args.max_items and rng.random() < 0.5:
+                count += 1
+            counts.append(count)
+        return counts
+
+    def distinct_products(self, rng: random.Random, count: int) -> List[int]:
+        count = min(count, self.args.products)
+        chosen = []
+        while len(chosen) < count:
+            product_id = self.popularity.sample(rng)
+            if product_id not in chosen:
+                chosen.append(product_id)
+        return chosen
+
+    def plan_items(self):
+        """First order item ID of each order partition, from the item counts alone."""
+        self.first_item_ids = [1]
+        for start in range(1, self.args.orders + 1, PARTITION_SIZE):
+            stop = min(start + PARTITION_SIZE, self.args.orders + 1)
+            self.first_item_ids.append(self.first_item_ids[-1] + sum(self.item_counts(start, stop)))
+        return self.first_item_ids[-1] - 1
+
+    def plan_reservations(self):
+        """Units held per product by the reservations, from the same partitions."""
+        for start in range(1, self.args.reservations + 1, PARTITION_SIZE):
+            stop = min(start + PARTITION_SIZE, self.args.reservations + 1)
+            for _, _, product_id, quantity, _ in self.reservations(start, stop):
+                self.reserved[product_id] += quantity
+
+
+def columns(model) -> List[str]:
+    """Model columns to COPY; generated ones are computed by Postgres."""
+    return [column.name for column in model.__table__.columns if column.computed is None]
+
+
+async def connect(args) -> asyncpg.Connection:
+    conn = await asyncpg.connect(
+        user=DEFAULT_USER, password=DEFAULT_PASSWORD, host=DEFAULT_HOST,
+        port=int(DEFAULT_PORT), database=args.database,
+    )
+    if args.skip_fk_checks:
+        # Disables FK triggers for this session; needs superuser
+        await conn.execute("SET session_replication_role = replica")
+    return conn
+
+
+async def copy_table(args, model, count: int, generate: Callable, after=None):
+    """COPY ``count`` rows of a model in partitions spread over ``--jobs`` connections."""
+    table, names = model.__table__.name, columns(model)
+    partitions = asyncio.Queue()
+    for start in range(1, count + 1, PARTITION_SIZE):
+        partitions.put_nowait((start, min(start + PARTITION_SIZE, count + 1)))
+
+    async def job():
+        conn = await connect(args)
+        try:
+            while not partitions.empty():
+                start, stop = partitions.get_nowait()
+                await conn.copy_records_to_table(
+                    table, records=generate(start, stop), columns=names
+                )
+                if after is not None:
+                    await after(conn, start, stop)
+        finally:
+            await conn.close()
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(job() for _ in range(min(args.jobs, partitions.qsize()) or 1)))
+    elapsed = time.perf_counter() - begin
+    print(f"{table:<14} {count:>12,} rows in {elapsed:7.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+async def run(args):
+    seeder = Seeder(args)
+    items = seeder.plan_items()
+    seeder.plan_reservations()
+    conn = await connect(args)
+    try:
+        if args.truncate:
+            await conn.execute(
+                "TRUNCATE order_items, orders, reservations, products, categories, users, "
+                "inventory_flush_batches RESTART IDENTITY CASCADE"
+            )
+
+        begin = time.perf_counter()
+        await copy_table(args, CategoryModel, args.categories, seeder.categories)
+        await copy_table(args, UserModel, args.users, seeder.users)
+        await copy_table(args, ProductModel, args.products, seeder.products)
+
+        async def copy_items(conn, start, stop):
+            # Same connection, right after the matching orders, so FKs hold
+            await conn.copy_records_to_table(
+                OrderItemModel.__table__.name,
+                records=seeder.order_items(start, stop),
+                columns=columns(OrderItemModel),
+            )
+
+        await copy_table(args, OrderModel, args.orders, seeder.orders, after=copy_items)
+        print(f"{'order_items':<14} {items:>12,} rows (loaded with orders)")
+        await copy_table(args, ReservationModel, args.reservations, seeder.reservations)
+
+        tables = [
+            model.__table__.name
+            for model in (CategoryModel, UserModel, ProductModel, OrderModel, OrderItemModel, ReservationModel)
+        ]
+        for table in tables:
+            # Continue the sequence after the loaded IDs; empty tables start at 1
+            await conn.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"coalesce(max(id), 1), max(id) IS NOT NULL) FROM {table}"
+            )
+        await conn.execute(f"ANALYZE {', '.join(tables)}")
+        print(f"done in {time.perf_counter() - begin:.1f}s")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--categories", type=int, default=100)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--max-items", type=int, default=5, help="items per order at most")
+    parser.add_argument("--product-skew", type=float, default=1.1)
+    parser.add_argument("--user-skew", type=float, default=1.2)
+    parser.add_argument("--expired-ratio", type=float, default=0.3)
+    parser.add_argument("--password", default="password", help="password of every user")
+    parser.add_argument("--database", default=DEFAULT_DB)
+    parser.add_argument("--jobs", type=int, default=4, help="parallel COPY connections")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first")
+    parser.add_argument(
+        "--skip-fk-checks", action="store_true",
+        help="disable FK triggers while loading (superuser only)",
+    )
+    args = parser.parse_args()
+    if min(args.categories, args.users, args.products) < 1:
+        parser.error("--categories, --users and --products must be at least 1")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
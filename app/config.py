@@ -11,12 +11,101 @@ DEFAULT_PORT = os.getenv('DEFAULT_PORT', 5432)
 
 DATABASE_URL = f'postgresql+asyncpg://{DEFAULT_USER}:{DEFAULT_PASSWORD}@{DEFAULT_HOST}:{DEFAULT_PORT}/{DEFAULT_DB}'
 
+# Per-process connection pool. DB_POOL_SIZE + DB_MAX_OVERFLOW is the most
+# connections a worker opens; size it against pgbouncer's pool per worker.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10.0))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements cached per connection. DB_PGBOUNCER=true disables the
+# cache and names statements uniquely, as pgbouncer transaction pooling needs.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+# Per-statement timeout in milliseconds, 0 to disable. Enforced by Postgres
+# (statement_timeout), or client-side in pgbouncer mode, which rejects it.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+
+# Comma-separated asyncpg URLs of read replicas serving GET endpoints. A
+# replica lagging more than REPLICA_MAX_LAG seconds is taken out of rotation
+# until it catches up; clients that just wrote read from the primary for
+# READ_YOUR_WRITES_WINDOW seconds.
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 5.0))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 2.0))
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", 10.0))
+
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
 REDIS_PORT = os.getenv('REDIS_PORT', 6379)
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD')
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+
+REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+
+# Per-process connection pool; requests wait up to REDIS_POOL_TIMEOUT for a
+# free connection instead of opening new ones past REDIS_MAX_CONNECTIONS.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5.0))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 2.0))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2.0))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
 
-REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+# Serializer for cached values: "orjson" (default), "msgpack" or "json"
+CACHE_CODEC = os.getenv("CACHE_CODEC", "orjson")
+
+# Optional fleet-wide rebuild lock: one worker reloads an expired key while
+# the others wait up to CACHE_LOCK_WAIT seconds before loading it themselves.
+CACHE_LOCK_ENABLED = os.getenv("CACHE_LOCK_ENABLED", "false").lower() == "true"
+CACHE_LOCK_TTL = float(os.getenv("CACHE_LOCK_TTL", 5.0))
+CACHE_LOCK_WAIT = float(os.getenv("CACHE_LOCK_WAIT", 0.2))
+
+# In-process L1 cache in front of Redis for services that opt in; entries are
+# evicted on every worker through CACHE_INVALIDATION_CHANNEL.
+LOCAL_CACHE_ENABLED = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() == "true"
+LOCAL_CACHE_MAX_SIZE = int(os.getenv("LOCAL_CACHE_MAX_SIZE", 5000))
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", 30.0))
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Decoded access-token claims are kept in-process to skip JWT verification
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300.0))
+
+# bcrypt runs in a bounded thread pool off the event loop; once
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE calls are pending, new
+# ones are rejected with 503. Stored hashes below BCRYPT_ROUNDS are
+# re-hashed on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+# "db" keeps stock in products.quantity; "redis" keeps hot counters in Redis
+# and writes the accumulated deltas back to Postgres in the background.
+INVENTORY_BACKEND = os.getenv("INVENTORY_BACKEND", "db")
+INVENTORY_FLUSH_INTERVAL = float(os.getenv("INVENTORY_FLUSH_INTERVAL", 1.0))
+INVENTORY_LOCK_TIMEOUT = float(os.getenv("INVENTORY_LOCK_TIMEOUT", 10.0))
+
+# Upper bound on rows accepted by the bulk product endpoints per request
+PRODUCT_BULK_MAX_ROWS = int(os.getenv("PRODUCT_BULK_MAX_ROWS", 10000))
+
+# Background release of expired reservations; each batch is one transaction
+RESERVATION_SWEEPER_ENABLED = os.getenv("RESERVATION_SWEEPER_ENABLED", "true").lower() == "true"
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", 30.0))
+RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv("RESERVATION_SWEEP_BATCH_SIZE", 500))
+
+# Cache-Control max-age (seconds) sent with catalog responses and their ETags
+PRODUCTS_CACHE_MAX_AGE = int(os.getenv("PRODUCTS_CACHE_MAX_AGE", 30))
+CATEGORIES_CACHE_MAX_AGE = int(os.getenv("CATEGORIES_CACHE_MAX_AGE", 300))
+
+# Per-request SQL statement checks against app.query_budgets: "off", "warn"
+# (log and count violations) or "raise" (fail the request before its
+# transaction commits, for tests and staging; violations found after a
+# commit are only logged). A statement shape repeated more than
+# QUERY_REPEAT_THRESHOLD times in one request is reported as a likely N+1.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn")
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 5))
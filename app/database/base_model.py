@@ -28,37 +28,45 @@ class Base:
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
 
-    async def save(self, db_session: AsyncSession):
+    async def save(self, db_session: AsyncSession, commit: bool = True):
         """
         :param db_session:
+        :param commit: flush only when False, leaving the commit to the caller
         :return:
         """
         try:
             db_session.add(self)
+            if not commit:
+                return await db_session.flush()
             return await db_session.commit()
         except SQLAlchemyError as ex:
             logger.error(format_exc())
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=repr(ex))
 
-    async def delete(self, db_session: AsyncSession):
+    async def delete(self, db_session: AsyncSession, commit: bool = True):
         """
         :param db_session:
+        :param commit: flush only when False, leaving the commit to the caller
         :return:
         """
         try:
             await db_session.delete(self)
-            await db_session.commit()
+            if commit:
+                await db_session.commit()
+            else:
+                await db_session.flush()
             return True
         except SQLAlchemyError as ex:
             logger.error(format_exc())
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=repr(ex))
 
-    async def update(self, db_session: AsyncSession, **kwargs):
+    async def update(self, db_session: AsyncSession, commit: bool = True, **kwargs):
         """
         :param db_session:
+        :param commit: flush only when False, leaving the commit to the caller
         :param kwargs:
         :return:
         """
         for k, v in kwargs.items():
             setattr(self, k, v)
-        await self.save(db_session)
\ No newline at end of file
+        await self.save(db_session, commit=commit)
\ No newline at end of file
@@ -1,19 +1,7 @@
 from typing import AsyncGenerator
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
-
-
-engine = create_async_engine(
-    DATABASE_URL,
-    future=True,
-    echo=False,
-    
-)
-
-async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+from app.database.database import async_session
 
 
 # Dependency
@@ -11,8 +11,11 @@ import pathlib
 sys.path.append(str(pathlib.Path(__file__).resolve(strict=True).parent.parent))
 
 from config import DATABASE_URL
+from fastapi import Request
+from app.database.engine import create_engine
+from app.database.replicas import replica_router, is_pinned
 
-engine = create_async_engine(DATABASE_URL, future=True, echo=False)
+engine = create_engine(DATABASE_URL)
 async_session = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -22,4 +25,16 @@ async def get_db():
         yield session
 
 
+def read_session(pinned: bool = False) -> AsyncSession:
+    """Session on the next healthy replica, or on the primary if pinned or none is."""
+    replica = None if pinned else replica_router.pick()
+    return async_session(bind=replica or engine)
+
+
+# Dependency for read-only endpoints
+async def get_read_db(request: Request):
+    async with read_session(is_pinned(request)) as session:
+        yield session
+
+
 Base = declarative_base()
\ No newline at end of file
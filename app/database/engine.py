@@ -0,0 +1,94 @@
+import time
+from typing import Dict
+from uuid import uuid4
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_PGBOUNCER,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+from app.metrics import DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS, Gauge
+
+# Engines created by this process, by name, for the pool gauges
+engines: Dict[str, AsyncEngine] = {}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc(pool=self.logging_name)
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(
+                time.perf_counter() - start, pool=self.logging_name
+            )
+
+
+def create_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """
+    Create an async engine with the pool settings from ``app.config``.
+    Args:
+        url (str): SQLAlchemy database URL using the asyncpg driver.
+        name (str): Pool name used in metrics and logs.
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    connect_args = {}
+    cache_size = DB_STATEMENT_CACHE_SIZE
+    if DB_PGBOUNCER:
+        # Transaction pooling may hand each statement a different server
+        # connection, so prepared statements can't be reused or share names
+        cache_size = 0
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["command_timeout"] = DB_STATEMENT_TIMEOUT_MS / 1000
+    elif DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+
+    url = make_url(url).update_query_dict({"prepared_statement_cache_size": str(cache_size)})
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_logging_name=name,
+        connect_args=connect_args,
+    )
+    engines[name] = engine
+    return engine
+
+
+Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of each pool.",
+    ("pool",),
+    callback=lambda: {(name,): e.pool.checkedout() for name, e in engines.items()},
+)
+
+Gauge(
+    "db_pool_saturation",
+    "Checked-out connections as a fraction of pool size plus overflow.",
+    ("pool",),
+    callback=lambda: {
+        (name,): e.pool.checkedout() / (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+        for name, e in engines.items()
+    },
+)
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from itertools import count
+from typing import Callable, List, Optional
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import (
+    DATABASE_REPLICA_URLS,
+    REPLICA_MAX_LAG,
+    REPLICA_CHECK_INTERVAL,
+    READ_YOUR_WRITES_WINDOW,
+)
+from app.database.engine import create_engine
+from app.metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+# Set on responses to writes; until then the client reads from the primary
+PIN_COOKIE = "db_primary_until"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Zero when the replica has replayed everything it received, so an idle
+# primary doesn't look like replication lag
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str], max_lag: float = REPLICA_MAX_LAG):
+        """
+        Load-balances reads over replicas and ejects the lagging ones.
+        Attributes:
+            replicas (List[Replica]): One engine per replica URL.
+            max_lag (float): Seconds of replay lag before a replica is ejected.
+        """
+        self.replicas = [
+            Replica(f"replica{i}", create_engine(url, name=f"replica{i}"))
+            for i, url in enumerate(urls)
+        ]
+        self.max_lag = max_lag
+        self._turn = count()
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def is_replica(self, bind) -> bool:
+        """Whether a session bind is one of the replica engines."""
+        return any(replica.engine is bind for replica in self.replicas)
+
+    def pick(self) -> Optional[AsyncEngine]:
+        """Next healthy replica in round-robin order, or None for the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)].engine
+
+    async def check(self):
+        """Measure every replica's lag and update its place in the rotation."""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    replica.lag = float(await conn.scalar(LAG_QUERY) or 0)
+                healthy = replica.lag <= self.max_lag
+            except Exception:
+                logger.exception(f"Lag check failed for {replica.name}")
+                healthy = False
+            if healthy != replica.healthy:
+                logger.warning(
+                    f"{replica.name} {'back in rotation' if healthy else 'ejected'}"
+                    f" (lag {replica.lag:.1f}s)"
+                )
+            replica.healthy = healthy
+
+    def repeat_later(self, invalidate: Callable):
+        """
+        Run a cache invalidation again once replicas can no longer be behind it.
+        A read served by a lagging replica right after a write could put the
+        old row back into the cache; repeating the invalidation after the
+        worst tolerated lag removes it.
+        """
+        if not self.enabled:
+            return
+        delay = self.max_lag + REPLICA_CHECK_INTERVAL
+        asyncio.get_running_loop().call_later(delay, self._spawn, invalidate)
+
+    def _spawn(self, invalidate: Callable):
+        task = asyncio.create_task(invalidate())
+        self._pending.add(task)
+        task.add_done_callback(self._finish)
+
+    def _finish(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Delayed cache invalidation failed", exc_info=task.exception())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+
+def is_pinned(request: Request) -> bool:
+    """Whether the client wrote recently enough to need the primary."""
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def pin_writes_to_primary(request: Request, call_next) -> Response:
+    """Middleware giving clients read-your-writes after any write request."""
+    response = await call_next(request)
+    if replica_router.enabled and request.method not in SAFE_METHODS:
+        response.set_cookie(
+            PIN_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_WINDOW),
+            max_age=int(READ_YOUR_WRITES_WINDOW) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
+
+Gauge(
+    "db_replica_lag_seconds",
+    "Replay lag of each read replica at the last check.",
+    ("replica",),
+    callback=lambda: {(r.name,): r.lag for r in replica_router.replicas},
+)
+
+Gauge(
+    "db_replica_healthy",
+    "1 while a replica is in the read rotation, 0 while ejected.",
+    ("replica",),
+    callback=lambda: {(r.name,): int(r.healthy) for r in replica_router.replicas},
+)
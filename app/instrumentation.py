@@ -0,0 +1,286 @@
+"""
+Per-route request instrumentation.
+
+A middleware opens a ``RequestStats`` for every request in a context
+variable; SQLAlchemy, Redis and cache hooks add to it from anywhere in the
+request, and the totals are recorded against the route template when the
+response is ready. Work outside a request (background workers) isn't
+attributed to any route.
+
+SQL statements are also tallied by shape, so each request can be checked
+against its entry in ``app.query_budgets`` and repeated statements reported
+as likely N+1 queries. ``query_budget()`` runs the same checks in tests.
+In ``raise`` mode the check also runs right before a request's transaction
+commits, so a request over budget fails without its writes being kept.
+"""
+import logging
+import re
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.config import QUERY_BUDGET_MODE, QUERY_REPEAT_THRESHOLD
+from app.metrics import Counter, Histogram
+from app.query_budgets import QUERY_BUDGETS, QueryBudget
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    def __init__(self, method: str = None, scope: dict = None):
+        self.method = method
+        self.scope = scope
+        self.committed = False
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        self.cache = Tally()
+        self.statements = Tally()
+
+    @property
+    def route(self) -> str:
+        # Starlette stores the matched route in the scope while routing
+        route = self.scope.get("route") if self.scope is not None else None
+        return route.path if route is not None else "unmatched"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when statements exceed a budget in ``raise`` mode or in tests."""
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_stats", default=None)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status code.",
+    ("route", "method", "status"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database statements executed per request.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_SECONDS = Counter(
+    "http_db_seconds_total", "Time spent in database statements per route.", ("route",)
+)
+REDIS_CALLS = Counter(
+    "http_redis_calls_total", "Redis round trips per route.", ("route",)
+)
+REDIS_SECONDS = Counter(
+    "http_redis_seconds_total", "Time spent waiting on Redis per route.", ("route",)
+)
+ROUTE_CACHE_REQUESTS = Counter(
+    "http_cache_requests_total",
+    "Cache lookups per route, entity, tier and result.",
+    ("route", "entity", "tier", "result"),
+)
+QUERY_BUDGET_VIOLATIONS = Counter(
+    "http_query_budget_violations_total",
+    "Requests over their statement budget or repeating a statement shape.",
+    ("route", "kind"),
+)
+
+_PARAMS = re.compile(r"\$\d+(?:::\w+(?:\[\])?)?")
+_PARAM_LISTS = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))*")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """SQL text with bound parameters and expanded IN/VALUES lists collapsed."""
+    return _PARAM_LISTS.sub("(?)", _PARAMS.sub("?", " ".join(statement.split())))
+
+
+def record_db(seconds: float, statement: str = None, executemany: bool = False):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+        # An executemany is already batched however many rows it carries
+        if statement is not None and not executemany:
+            stats.statements[statement_shape(statement)] += 1
+
+
+def record_redis(seconds: float):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.redis_calls += 1
+        stats.redis_seconds += seconds
+
+
+def record_cache(entity: str, tier: str, result: str):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.cache[(entity, tier, result)] += 1
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_db(time.perf_counter() - conn.info["query_start"].pop(), statement, executemany)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    stats = current_stats.get()
+    if QUERY_BUDGET_MODE != "raise" or stats is None or stats.method is None:
+        return
+    # Count the final flush too, then fail before anything is committed
+    session.flush()
+    violations = budget_violations(stats, route_budget(stats.method, stats.route))
+    if violations:
+        report_violations(stats.method, stats.route, violations)
+        raise QueryBudgetExceeded(
+            "\n".join(f"{stats.method} {stats.route}: {detail}" for _, detail in violations)
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.committed = True
+
+
+def budget_violations(stats: RequestStats, budget: QueryBudget) -> List[Tuple[str, str]]:
+    """
+    Check a request's statements against a budget.
+    Args:
+        stats (RequestStats): Statements recorded for the request.
+        budget (QueryBudget): Statement and repeat limits; None disables one.
+    Returns:
+        List[Tuple[str, str]]: ``(kind, detail)`` per violation, where kind
+        is ``queries`` or ``repeats``.
+    """
+    violations = []
+    if budget.queries is not None and stats.db_queries > budget.queries:
+        violations.append(
+            ("queries", f"{stats.db_queries} statements, budget {budget.queries}")
+        )
+    if budget.repeats is not None:
+        for shape, count in stats.statements.most_common():
+            if count <= budget.repeats:
+                break
+            violations.append(("repeats", f"{count}x {shape[:300]}"))
+    return violations
+
+
+def route_budget(method: str, route: str) -> QueryBudget:
+    return QUERY_BUDGETS.get((method, route), QueryBudget(None))
+
+
+class QueryWatch:
+    def __init__(self):
+        """
+        Statements seen inside a ``query_budget()`` block.
+        Attributes:
+            stats (RequestStats): Statements run directly in the block.
+            requests (list): ``(method, route, RequestStats)`` of every
+                request the app finished while the block was open.
+        """
+        self.stats = RequestStats()
+        self.requests: List[Tuple[str, str, RequestStats]] = []
+
+
+# Open query_budget() blocks; requests report to them from any thread
+_watches: List[QueryWatch] = []
+
+
+@contextmanager
+def query_budget(queries: Optional[int] = None, repeats: Optional[int] = QUERY_REPEAT_THRESHOLD):
+    """
+    Fail a test if SQL statements in the block exceed a budget.
+
+    Statements run directly in the block (e.g. service calls) are checked
+    together against ``queries``. Every request the app serves meanwhile,
+    including through ``TestClient``, is checked on its own against
+    ``queries``, or against its ``QUERY_BUDGETS`` entry when ``queries`` is
+    None.
+    Args:
+        queries (int): Most statements allowed per request or block.
+        repeats (int): Most times one statement shape may run per request.
+    Yields:
+        QueryWatch: The recorded statements, for further assertions.
+    Raises:
+        QueryBudgetExceeded: On leaving the block, if any budget was exceeded.
+    """
+    watch = QueryWatch()
+    token = current_stats.set(watch.stats)
+    _watches.append(watch)
+    try:
+        yield watch
+    finally:
+        _watches.remove(watch)
+        current_stats.reset(token)
+
+    violations = [
+        f"block: {detail}"
+        for _, detail in budget_violations(watch.stats, QueryBudget(queries, repeats))
+    ]
+    for method, route, stats in watch.requests:
+        budget = route_budget(method, route) if queries is None else QueryBudget(queries, repeats)
+        violations += [
+            f"{method} {route}: {detail}" for _, detail in budget_violations(stats, budget)
+        ]
+    if violations:
+        raise QueryBudgetExceeded("\n".join(violations))
+
+
+def report_violations(method: str, route: str, violations: List[Tuple[str, str]]):
+    for kind, detail in violations:
+        QUERY_BUDGET_VIOLATIONS.inc(route=route, kind=kind)
+        logger.warning(f"{method} {route}: {detail}")
+
+
+def check_query_budget(method: str, route: str, stats: RequestStats):
+    """
+    Report a finished request to open watches and apply QUERY_BUDGET_MODE.
+    In ``raise`` mode a request that committed is only logged: its writes
+    stand, so failing it now would report an error for a change that was
+    made. Those requests were already checked before their commit.
+    """
+    for watch in list(_watches):
+        watch.requests.append((method, route, stats))
+    if QUERY_BUDGET_MODE == "off":
+        return
+    violations = budget_violations(stats, route_budget(method, route))
+    report_violations(method, route, violations)
+    if violations and QUERY_BUDGET_MODE == "raise" and not stats.committed:
+        raise QueryBudgetExceeded(
+            "\n".join(f"{method} {route}: {detail}" for _, detail in violations)
+        )
+
+
+async def instrument_requests(request: Request, call_next) -> Response:
+    """Middleware recording per-route usage and checking query budgets."""
+    stats = RequestStats(request.method, request.scope)
+    token = current_stats.set(stats)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        current_stats.reset(token)
+        path = stats.route
+        REQUEST_SECONDS.observe(elapsed, route=path, method=request.method, status=status)
+        REQUEST_DB_QUERIES.observe(stats.db_queries, route=path)
+        DB_SECONDS.inc(stats.db_seconds, route=path)
+        REDIS_CALLS.inc(stats.redis_calls, route=path)
+        REDIS_SECONDS.inc(stats.redis_seconds, route=path)
+        for (entity, tier, result), count in stats.cache.items():
+            ROUTE_CACHE_REQUESTS.inc(count, route=path, entity=entity, tier=tier, result=result)
+    check_query_budget(request.method, path, stats)
+    return response
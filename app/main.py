@@ -1,8 +1,53 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import products, categories, users, orders, reservations, auth
+from app.config import INVENTORY_BACKEND, LOCAL_CACHE_ENABLED, RESERVATION_SWEEPER_ENABLED
+from app.database.database import engine
+from app.database.replicas import replica_router, pin_writes_to_primary
+from app.instrumentation import instrument_requests
+from app.routers import products, categories, users, orders, reservations, auth, metrics
+from app.services.password_hasher import password_hasher
+from app.services.redis_service import init_redis, close_redis
+from app.workers.cache_invalidation import CacheInvalidationListener
+from app.workers.inventory_flusher import InventoryFlusher
+from app.workers.reservation_sweeper import ReservationSweeper
 import uvicorn
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_redis()
+    if replica_router.enabled:
+        await replica_router.check()
+        replica_router.start()
+    cache_listener = None
+    if LOCAL_CACHE_ENABLED:
+        cache_listener = CacheInvalidationListener()
+        cache_listener.start()
+    inventory_flusher = None
+    if INVENTORY_BACKEND == "redis":
+        inventory_flusher = InventoryFlusher()
+        await inventory_flusher.reconcile()
+        inventory_flusher.start()
+    reservation_sweeper = None
+    if RESERVATION_SWEEPER_ENABLED:
+        reservation_sweeper = ReservationSweeper()
+        reservation_sweeper.start()
+    yield
+    if reservation_sweeper is not None:
+        await reservation_sweeper.stop()
+    if inventory_flusher is not None:
+        await inventory_flusher.stop()
+    if cache_listener is not None:
+        await cache_listener.stop()
+    await replica_router.stop()
+    await close_redis()
+    await engine.dispose()
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(pin_writes_to_primary)
+app.middleware("http")(instrument_requests)
 
 app.include_router(products.router, prefix="/api", tags=["products"])
 app.include_router(categories.router, prefix="/api", tags=["categories"])
@@ -10,6 +55,7 @@ app.include_router(orders.router, prefix="/api", tags=["orders"])
 app.include_router(users.router, prefix="/api", tags=["users"])
 app.include_router(reservations.router, prefix="/api", tags=["reservations"])
 app.include_router(auth.router, tags=["auth"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 if __name__ == "__main__":
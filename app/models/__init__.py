@@ -4,6 +4,7 @@ from .product import ProductModel
 from .user import UserModel
 from .reservation import ReservationModel
 from .order_item import OrderItemModel
+from .inventory_flush_batch import InventoryFlushBatchModel
 
 # Optionally, define an `__all__` for cleaner imports if needed
 __all__ = [
@@ -13,4 +14,5 @@ __all__ = [
     "UserModel",
     "ReservationModel",
     "OrderItemModel",
+    "InventoryFlushBatchModel",
 ]
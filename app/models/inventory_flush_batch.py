@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime, func
+from app.database.base_model import Base
+
+
+class InventoryFlushBatchModel(Base):
+    """A batch of Redis inventory deltas already written to ``products.quantity``."""
+
+    __tablename__ = "inventory_flush_batches"
+
+    id = Column(String, primary_key=True)
+    applied_at = Column(DateTime, nullable=False, server_default=func.now())
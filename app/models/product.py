@@ -1,18 +1,39 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.database.base_model import Base
 from app.schemas.products import ProductCreate, ProductUpdate, Product
 
 
 class ProductModel(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String)
     price = Column(Float)
     quantity = Column(Integer)
-    category_id = Column(Integer, ForeignKey("categories.id"))
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True)
+    # Maintained by Postgres for full-text search; never loaded with the row
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
     category = relationship("CategoryModel")
 
     reservations = relationship(
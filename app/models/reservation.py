@@ -11,7 +11,7 @@ class ReservationModel(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    expires_at = Column(DateTime, default=lambda: datetime.utcnow() + timedelta(minutes=30))  # Default 30 minutes
+    expires_at = Column(DateTime, index=True, default=lambda: datetime.utcnow() + timedelta(minutes=30))  # Default 30 minutes
 
     user = relationship("UserModel", back_populates="reservations")
     product = relationship("ProductModel", back_populates="reservations")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, text
 from sqlalchemy.orm import relationship
 from app.database.base_model import Base
 
@@ -9,4 +9,6 @@ class UserModel(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String(120), unique=True, nullable=False)
     password = Column(String, nullable=False)
+    # Bumped to revoke every token issued before, e.g. on a password change
+    token_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
     reservations = relationship("ReservationModel", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
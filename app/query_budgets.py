@@ -0,0 +1,41 @@
+"""
+SQL statement budgets per route.
+
+Each entry caps the statements one request may run with a cold cache and
+the default ``db`` inventory backend, and how often a single statement shape
+may repeat in it before it's reported as an N+1. Budgets are checked by the
+request middleware in ``app.instrumentation`` (see ``QUERY_BUDGET_MODE``) and
+by ``query_budget()`` in tests. Routes not listed only get the repeat check.
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+from app.config import QUERY_REPEAT_THRESHOLD
+
+
+class QueryBudget(NamedTuple):
+    queries: Optional[int]
+    repeats: Optional[int] = QUERY_REPEAT_THRESHOLD
+
+
+QUERY_BUDGETS: Dict[Tuple[str, str], QueryBudget] = {
+    # Order plus its items through selectinload
+    ("GET", "/api/orders/"): QueryBudget(2),
+    ("GET", "/api/orders/{order_id}"): QueryBudget(2),
+    # Stock decrement, prices, order, items; one more to explain a shortage
+    ("POST", "/api/orders/"): QueryBudget(5),
+    # Load, take stock, return stock, new prices, then one statement each to
+    # update, insert and delete items
+    ("PUT", "/api/orders/{order_id}"): QueryBudget(8),
+    # Load, return stock, delete items, delete order
+    ("DELETE", "/api/orders/{order_id}"): QueryBudget(5),
+    ("GET", "/api/products/"): QueryBudget(1),
+    ("GET", "/api/products/{product_id}"): QueryBudget(1),
+    # Facet counts and the page
+    ("GET", "/api/products/search"): QueryBudget(2),
+    ("POST", "/api/products/"): QueryBudget(1),
+    ("PUT", "/api/products/{product_id}"): QueryBudget(2),
+    # Load, load reservations for the delete cascade, delete
+    ("DELETE", "/api/products/{product_id}"): QueryBudget(3),
+    # Statement count grows with the batches; batches share their shape
+    ("POST", "/api/products/bulk"): QueryBudget(None, repeats=None),
+    ("PATCH", "/api/products/bulk"): QueryBudget(None, repeats=None),
+}
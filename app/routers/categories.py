@@ -1,6 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-from database.database import get_db
+from app.config import CATEGORIES_CACHE_MAX_AGE
+from app.database.database import get_db, get_read_db
+from app.utils import (
+    set_next_cursor,
+    cached_json_response,
+    check_not_modified,
+    set_cache_headers,
+)
 from schemas.categories import CategoryCreate, Category
 from services.category_service import CategoryService
 
@@ -8,9 +15,23 @@ router = APIRouter()
 
 
 @router.get("/categories/{category_id}", response_model=Category)
-async def read_category(category_id: int, db: Session = Depends(get_db)):
+async def read_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+):
     service = CategoryService(db)
-    return await service.get_one(category_id)
+    not_modified = await check_not_modified(
+        request, lambda: service.get_one_etag(category_id), CATEGORIES_CACHE_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
+    result = await service.get_one(category_id, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result, max_age=CATEGORIES_CACHE_MAX_AGE)
+    set_cache_headers(response, service.etag_for(result), CATEGORIES_CACHE_MAX_AGE)
+    return result
 
 
 @router.post("/categories/", response_model=Category)
@@ -21,10 +42,25 @@ async def create_category(category: CategoryCreate, db: Session = Depends(get_db
 
 @router.get("/categories/", response_model=list[Category])
 async def read_categories(
-    skip: int = 0, limit: int = 10, db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
 ):
     service = CategoryService(db)
-    return await service.get(skip=skip, limit=limit)
+    not_modified = await check_not_modified(
+        request, lambda: service.get_etag(skip, limit, cursor), CATEGORIES_CACHE_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
+    result = await service.get(skip=skip, limit=limit, cursor=cursor, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result, max_age=CATEGORIES_CACHE_MAX_AGE)
+    set_next_cursor(response, result, limit)
+    set_cache_headers(response, service.etag_for(result), CATEGORIES_CACHE_MAX_AGE)
+    return result
 
 
 @router.put("/categories/{category_id}", response_model=Category)
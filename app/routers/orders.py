@@ -1,23 +1,50 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_read_db
+from app.utils import set_next_cursor, cached_json_response
 from app.models.order import OrderModel
 from app.schemas.orders import OrderCreate, OrderUpdate, Order
+from app.services.export_service import ExportService
 from app.services.order_service import OrderService
 
 router = APIRouter()
 
 
 @router.get("/orders/", response_model=list[Order])
-async def read_orders(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_orders(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+):
     service = OrderService(db)
-    return await service.get(skip=skip, limit=limit)
+    result = await service.get(skip=skip, limit=limit, cursor=cursor, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result)
+    set_next_cursor(response, result, limit)
+    return result
+
+
+@router.get("/orders/export")
+async def export_orders(format: Literal["ndjson", "csv"] = "ndjson", gzip: bool = False):
+    service = ExportService(format, compress=gzip)
+    return StreamingResponse(
+        service.orders(),
+        media_type=service.media_type,
+        headers=service.headers("orders"),
+    )
 
 
 @router.get("/orders/{order_id}", response_model=Order)
-async def read_order(order_id: int, db: Session = Depends(get_db)):
+async def read_order(order_id: int, db: Session = Depends(get_read_db)):
     service = OrderService(db)
-    return await service.get_one(order_id)
+    result = await service.get_one(order_id, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result)
+    return result
 
 
 @router.post("/orders/", response_model=Order)
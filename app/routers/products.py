@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Body, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database.database import get_db
-from schemas.products import ProductCreate, ProductUpdate, Product
+from app.config import PRODUCT_BULK_MAX_ROWS, PRODUCTS_CACHE_MAX_AGE
+from app.database.database import get_db, get_read_db
+from app.utils import (
+    set_next_cursor,
+    cached_json_response,
+    check_not_modified,
+    set_cache_headers,
+)
+from schemas.products import (
+    ProductCreate, ProductUpdate, Product, BulkResult, ProductSearchResult
+)
+from services.export_service import ExportService
 from services.product_service import ProductService
-import time
 
 router = APIRouter()
 
@@ -14,21 +25,106 @@ async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     return await service.create(product)
 
 
+def check_bulk_size(rows: list[dict]):
+    if len(rows) > PRODUCT_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {PRODUCT_BULK_MAX_ROWS} rows are accepted per request",
+        )
+
+
+# Bulk routes take raw rows so each one is validated and reported on its own
+@router.post("/products/bulk", response_model=BulkResult)
+async def bulk_create_products(
+    rows: list[dict] = Body(...), db: Session = Depends(get_db)
+):
+    check_bulk_size(rows)
+    service = ProductService(db)
+    return await service.bulk_create(rows)
+
+
+@router.patch("/products/bulk", response_model=BulkResult)
+async def bulk_update_products(
+    rows: list[dict] = Body(...), db: Session = Depends(get_db)
+):
+    check_bulk_size(rows)
+    service = ProductService(db)
+    return await service.bulk_update(rows)
+
+
 @router.get("/products/", response_model=list[Product])
-async def read_products(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    start_time = time.monotonic()
+async def read_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+):
     service = ProductService(db)
-    result = await service.get(skip=skip, limit=limit)
-    print("--- %s seconds ---" % (time.monotonic() - start_time))
+    not_modified = await check_not_modified(
+        request, lambda: service.get_etag(skip, limit, cursor), PRODUCTS_CACHE_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
+    result = await service.get(skip=skip, limit=limit, cursor=cursor, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result, max_age=PRODUCTS_CACHE_MAX_AGE)
+    set_next_cursor(response, result, limit)
+    set_cache_headers(response, service.etag_for(result), PRODUCTS_CACHE_MAX_AGE)
     return result
 
 
+@router.get("/products/search", response_model=ProductSearchResult)
+async def search_products(
+    q: str | None = None,
+    category_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock: bool = False,
+    skip: int = 0,
+    limit: int = Query(10, le=100),
+    db: Session = Depends(get_read_db),
+):
+    service = ProductService(db)
+    return await service.search(
+        q=q,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        skip=skip,
+        limit=limit,
+    )
+
+
+@router.get("/products/export")
+async def export_products(format: Literal["ndjson", "csv"] = "ndjson", gzip: bool = False):
+    service = ExportService(format, compress=gzip)
+    return StreamingResponse(
+        service.products(),
+        media_type=service.media_type,
+        headers=service.headers("products"),
+    )
+
+
 @router.get("/products/{product_id}", response_model=Product)
-async def read_product(product_id: int, db: Session = Depends(get_db)):
-    start_time = time.monotonic()
+async def read_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+):
     service = ProductService(db)
-    result = await service.get_one(product_id)
-    print("--- %s seconds ---" % (time.monotonic() - start_time))
+    not_modified = await check_not_modified(
+        request, lambda: service.get_one_etag(product_id), PRODUCTS_CACHE_MAX_AGE
+    )
+    if not_modified:
+        return not_modified
+    result = await service.get_one(product_id, raw=True)
+    if isinstance(result, bytes):
+        return cached_json_response(result, max_age=PRODUCTS_CACHE_MAX_AGE)
+    set_cache_headers(response, service.etag_for(result), PRODUCTS_CACHE_MAX_AGE)
     return result
 
 
@@ -1,22 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_read_db
 from app.models.reservation import ReservationModel
 from app.schemas.reservations import ReservationCreate, ReservationUpdate, Reservation
 from app.services.reservation_service import ReservationService
+from app.utils import set_next_cursor
 from typing import List
 
 router = APIRouter()
 
 
 @router.get("/reservations/", response_model=List[Reservation])
-async def read_reservations(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_reservations(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+):
     service = ReservationService(db)
-    return await service.get(skip=skip, limit=limit)
+    result = await service.get(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, result, limit)
+    return result
 
 
 @router.get("/reservations/{reservation_id}", response_model=Reservation)
-async def read_reservation(reservation_id: int, db: Session = Depends(get_db)):
+async def read_reservation(reservation_id: int, db: Session = Depends(get_read_db)):
     service = ReservationService(db)
     return await service.get_one(reservation_id)
 
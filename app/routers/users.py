@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from app.database.database import get_db
+from app.database.database import get_db, get_read_db
 from app.schemas.users import UserCreate, UserUpdate, UserView
 from app.services.user_service import UserService
+from app.utils import set_next_cursor
 
 router = APIRouter()
 
 
 @router.get("/users/{user_id}", response_model=UserView)
-async def read_user(user_id: int, db: Session = Depends(get_db)):
+async def read_user(user_id: int, db: Session = Depends(get_read_db)):
     service = UserService(db)
     return await service.get_one(user_id)
 
@@ -20,9 +21,17 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/users/", response_model=list[UserView])
-async def read_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+):
     service = UserService(db)
-    return await service.get(skip=skip, limit=limit)
+    result = await service.get(skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, result, limit)
+    return result
 
 
 @router.put("/users/{user_id}", response_model=UserView)
@@ -1,15 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 from typing import Optional
 from typing import List
 
 
 class OrderItemCreate(BaseModel):
     product_id: int
-    quantity: int
+    quantity: PositiveInt
 
 
 class OrderItem(OrderItemCreate):
     id: int
+    # Rows stored before quantities were validated still serialize
+    quantity: int
     price_at_order_time: float
 
     class Config:
@@ -24,3 +24,35 @@ class Product(ProductCreate):
     class Config:
         orm_mode = True
         from_attributes = True
+
+
+class ProductBulkUpdate(ProductUpdate):
+    id: int
+
+
+class BulkRowResult(BaseModel):
+    index: int
+    id: int
+
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkResult(BaseModel):
+    items: list[BulkRowResult]
+    # Bulk updates only: rows that changed no field
+    unchanged: list[BulkRowResult] = []
+    errors: list[BulkRowError]
+
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int]
+    count: int
+
+
+class ProductSearchResult(BaseModel):
+    items: list[Product]
+    total: int
+    facets: list[CategoryFacet]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 from datetime import datetime
 from typing import Optional
 
@@ -6,11 +6,13 @@ from typing import Optional
 class ReservationCreate(BaseModel):
     user_id: int
     product_id: int
-    quantity: int
+    quantity: PositiveInt
 
 
 class Reservation(ReservationCreate):
     id: int
+    # Rows stored before quantities were validated still serialize
+    quantity: int
     expires_at: datetime
 
     class Config:
@@ -18,4 +20,4 @@ class Reservation(ReservationCreate):
 
 
 class ReservationUpdate(BaseModel):
-    quantity: Optional[int] = None
\ No newline at end of file
+    quantity: Optional[PositiveInt] = None
\ No newline at end of file
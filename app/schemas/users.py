@@ -8,6 +8,10 @@ class UserView(BaseModel):
     email: EmailStr
 
 
+class UserPrincipal(UserView):
+    token_version: int = 0
+
+
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
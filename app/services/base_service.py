@@ -1,46 +1,223 @@
-from abc import ABC, abstractmethod
+import logging
+from abc import ABC
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Type
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.replicas import replica_router
 from app.exceptions import EntityNotFoundException
 from sqlalchemy.future import select
+from app.config import (
+    CACHE_LOCK_ENABLED,
+    CACHE_LOCK_TTL,
+    CACHE_LOCK_WAIT,
+    LOCAL_CACHE_ENABLED,
+)
+from app.instrumentation import record_cache
+from app.metrics import CACHE_REQUESTS
+from app.services.local_cache import local_cache
 from app.services.redis_service import RedisService
+from app.services.single_flight import SingleFlight
+from app.services.unit_of_work import UnitOfWork, UNIT_OF_WORK_KEY
+from app.utils import CachedPage, decode_cursor, make_etag, next_cursor
+
+logger = logging.getLogger(__name__)
+
+# Shared by all services in the worker so concurrent misses coalesce
+single_flight = SingleFlight()
 
 
 class BaseService(ABC):
-    def __init__(self, db: AsyncSession):
+    """
+    Base service class for CRUD operations.
+
+    Subclasses declare their ``model`` and opt into read-through caching by
+    setting ``schema`` (used to serialize cached entities) and ``cache_ttl``.
+    Hot entities can also set ``use_local_cache`` to keep single-entity
+    lookups in the in-process L1 cache in front of Redis.
+
+    Writes run inside ``unit_of_work()``: the session is committed once and
+    the cache changes queued meanwhile are sent to Redis only after that.
+    """
+
+    model = None
+    schema: Optional[Type[BaseModel]] = None
+    cache_ttl: Optional[int] = None
+    use_local_cache: bool = False
+
+    def __init__(self, db: AsyncSession, redis_service: RedisService = None):
         """
         Base service class for CRUD operations.
         Attributes:
             db (AsyncSession): Async SQLAlchemy session.
-            redis_service (RedisService): Redis service instance.
+            redis_service (RedisService): Redis service instance; defaults to
+                one backed by the shared process-wide client.
             entity_name (str): Name of the entity.
         """
         self.db = db
-        self.redis_service = RedisService()
+        self.redis_service = redis_service or RedisService()
         self.entity_name = self.__class__.__name__.replace("Service", "").lower()
 
-    @abstractmethod
-    async def get(self, skip: int = 0, limit: int = 10):
+    @property
+    def cache_enabled(self) -> bool:
+        """Whether the service declared a schema and TTL for caching."""
+        return self.schema is not None and self.cache_ttl is not None
+
+    @property
+    def raw_cache_enabled(self) -> bool:
+        """Whether cached values are JSON bytes that can be served as-is."""
+        return self.cache_enabled and self.redis_service.codec.media_type == "application/json"
+
+    @property
+    def local_cache_enabled(self) -> bool:
+        """Whether single-entity lookups also go through the L1 cache."""
+        return LOCAL_CACHE_ENABLED and self.use_local_cache and self.cache_enabled
+
+    def get_query(self):
+        """Base select for the service's model; override to add eager loads."""
+        return select(self.model)
+
+    def serialize(self, entity) -> dict:
+        """
+        Convert an entity into the JSON-safe dict stored in the cache.
+        Args:
+            entity: SQLAlchemy model instance.
+        Returns:
+            dict: Entity dumped through the service's schema.
+        """
+        return self.schema.model_validate(entity, from_attributes=True).model_dump(
+            mode="json"
+        )
+
+    async def get(
+        self, skip: int = 0, limit: int = 10, cursor: str = None, raw: bool = False
+    ):
         """
         Get all entities.
         Args:
-            skip (int): Number of entities to skip.
+            skip (int): Number of entities to skip. Ignored when a cursor is given.
             limit (int): Maximum number of entities to return.
+            cursor (str): Opaque cursor of the previous page's last entity.
+            raw (bool): If True, a cache hit returns the stored JSON bytes
+                undecoded, ready to be sent as the response body.
         Returns:
-            List of SQLAlchemy model instances.
+            List of SQLAlchemy model instances, or of serialized dicts when
+            the service caches, or a CachedPage on a raw cache hit.
         """
-        pass
+        query = self.paginate(self.get_query(), self.model, skip, limit, cursor)
+        if not self.cache_enabled:
+            result = await self.db.execute(query)
+            return result.scalars().all()
+
+        cache_key = await self.get_list_cache_key(
+            **self.get_page_params(skip, limit, cursor)
+        )
+        cached = await self.cache_get_page(cache_key, raw=raw)
+        if cached is not None:
+            return cached
+
+        async def load():
+            result = await self.db.execute(query)
+            serialized = [self.serialize(entity) for entity in result.scalars().all()]
+            await self.cache_set(
+                cache_key, serialized, cursor=next_cursor(serialized, limit) or ""
+            )
+            return serialized
 
-    @abstractmethod
-    async def get_one(self, id: int, use_cache=True):
+        return await self.load_through(cache_key, load)
+
+    async def get_one(self, id: int, use_cache=True, raw: bool = False):
         """
         Get a single entity by ID.
         Args:
             id (int): Entity ID.
-            use_cache (bool): If True, use the cache.
+            use_cache (bool): If True, read through the cache. Pass False when
+                the caller needs a live SQLAlchemy instance, e.g. to modify it.
+            raw (bool): If True, a cache hit returns the stored JSON bytes
+                undecoded, ready to be sent as the response body.
         Returns:
-            SQLAlchemy model instance.
+            SQLAlchemy model instance, or a serialized dict when read through
+            the cache, or bytes on a raw cache hit.
+        Raises:
+            EntityNotFoundException: If the entity doesn't exist.
+        """
+        if not (use_cache and self.cache_enabled):
+            return await self._fetch_one(id)
+
+        cache_key = self.get_cache_key(id=id)
+        cached = await self.cache_get(cache_key, local=self.local_cache_enabled, raw=raw)
+        if cached is not None:
+            return cached
+
+        async def load():
+            entity = await self._fetch_one(id)
+            serialized = self.serialize(entity)
+            await self.cache_set(cache_key, serialized, local=self.local_cache_enabled)
+            return serialized
+
+        return await self.load_through(cache_key, load)
+
+    async def get_for_update(self, id: int):
+        """
+        Load an entity and lock its row until the transaction ends.
+        Writers that derive stock changes from the row use this, so
+        concurrent updates and deletes of one entity run one after the
+        other, each seeing the row as the previous one left it.
+        Args:
+            id (int): Entity ID.
+        Returns:
+            SQLAlchemy model instance, refreshed from the locked row.
+        Raises:
+            EntityNotFoundException: If the entity doesn't exist, including
+                when a concurrent writer deleted it while we waited.
+        """
+        return await self._fetch_one(id, lock=True)
+
+    async def _fetch_one(self, id: int, lock: bool = False):
+        query = self.get_query().where(self.model.id == id)
+        if lock:
+            query = query.with_for_update().execution_options(populate_existing=True)
+        result = await self.db.execute(query)
+        entity = result.scalars().first()
+        if entity is None:
+            raise EntityNotFoundException(self.model.__name__)
+        return entity
+
+    async def load_through(self, cache_key: str, loader):
+        """
+        Rebuild a missed cache key once, however many requests missed it.
+        Concurrent misses in this worker share one ``loader`` call; misses on
+        the primary only share calls made on the primary. With
+        ``CACHE_LOCK_ENABLED`` a Redis lock also elects a single worker across
+        the fleet; the others wait briefly for its result and only load the
+        key themselves if it doesn't show up in time.
+        Args:
+            cache_key (str): Redis cache key being rebuilt.
+            loader: Coroutine function that loads, caches and returns the value.
+        Returns:
+            The cached value.
         """
-        pass
+        # A session pinned to the primary for read-your-writes must not be
+        # handed rows a lagging replica loaded
+        flight_key = cache_key
+        if self.db is not None and not replica_router.is_replica(self.db.bind):
+            flight_key = f"{cache_key}:primary"
+        return await single_flight.do(flight_key, lambda: self._rebuild(cache_key, loader))
+
+    async def _rebuild(self, cache_key: str, loader):
+        if not CACHE_LOCK_ENABLED:
+            return await loader()
+        lock_key = f"lock:{cache_key}"
+        token = await self.redis_service.acquire_lock(lock_key, CACHE_LOCK_TTL)
+        if token is None:
+            cached = await self.redis_service.wait_for(cache_key, CACHE_LOCK_WAIT)
+            if cached is not None:
+                return cached
+            return await loader()
+        try:
+            return await loader()
+        finally:
+            await self.redis_service.release_lock(lock_key, token)
 
     async def get_entity_or_404(self, model, id):
         """
@@ -60,42 +237,273 @@ class BaseService(ABC):
             raise EntityNotFoundException(model.__name__)
         return entity
 
-    def get_cache_key(self, id: int = None, is_list: bool = False, **kwargs) -> str:
+    def paginate(self, query, model, skip: int = 0, limit: int = 10, cursor: str = None):
+        """
+        Apply keyset pagination when a cursor is given, OFFSET otherwise.
+        Args:
+            query: SQLAlchemy select over the model.
+            model: SQLAlchemy model.
+            skip (int): Number of entities to skip.
+            limit (int): Maximum number of entities to return.
+            cursor (str): Opaque cursor of the previous page's last entity.
+        Returns:
+            The paginated select, ordered by ID.
+        """
+        query = query.order_by(model.id).limit(limit)
+        if cursor:
+            return query.where(model.id > decode_cursor(cursor))
+        return query.offset(skip)
+
+    def get_page_params(self, skip: int = 0, limit: int = 10, cursor: str = None) -> dict:
+        """
+        Normalise pagination arguments for use in a list cache key.
+        Args:
+            skip (int): Number of entities to skip.
+            limit (int): Maximum number of entities to return.
+            cursor (str): Opaque cursor of the previous page's last entity.
+        Returns:
+            dict: Keyword arguments for ``get_cache_key``.
+        """
+        if cursor:
+            return {"after": decode_cursor(cursor), "limit": limit}
+        return {"skip": skip, "limit": limit}
+
+    def get_cache_key(
+        self, id: int = None, is_list: bool = False, generation: int = 0, **kwargs
+    ) -> str:
         """
         Generate cache key dynamically.
         Args:
             id (int): Entity ID.
             is_list (bool): If True, generate a list cache key.
+            generation (int): List cache generation the key belongs to.
             kwargs: Additional parameters for list cache key (e.g., pagination).
         Returns:
             str: Redis cache key.
         """
         if is_list:
             list_key_parts = [f"{key}:{value}" for key, value in kwargs.items()]
-            return f"{self.entity_name}s:{':'.join(list_key_parts)}"
+            return f"{self.entity_name}s:g{generation}:{':'.join(list_key_parts)}"
         return f"{self.entity_name}:{id}"
 
-    @abstractmethod
+    def get_generation_key(self) -> str:
+        """Redis key of the counter that versions this entity's list caches."""
+        return f"{self.entity_name}s:generation"
+
+    async def get_list_cache_key(self, **kwargs) -> str:
+        """
+        Generate a list cache key in the entity's current generation.
+        Args:
+            kwargs: Parameters for the list cache key (e.g., pagination).
+        Returns:
+            str: Redis cache key.
+        """
+        generation = await self.redis_service.get_counter(self.get_generation_key())
+        return self.get_cache_key(is_list=True, generation=generation, **kwargs)
+
     async def create(self, obj):
         """Create an entity."""
-        pass
+        entity = self.model(**obj.model_dump())
+        async with self.unit_of_work():
+            await entity.save(self.db, commit=False)
+            await self.cache_entity(entity)
+            await self.invalidate_list_cache()
+        return entity
 
-    @abstractmethod
     async def update(self, id: int, obj):
         """Update an entity"""
-        pass
+        async with self.unit_of_work():
+            entity = await self.get_one(id, use_cache=False)
+            await entity.update(self.db, commit=False, **obj.model_dump(exclude_unset=True))
+            await self.cache_entity(entity)
+            await self.invalidate_list_cache()
+        return entity
 
-    @abstractmethod
     async def delete(self, id: int):
         """Delete an entity."""
-        pass
+        async with self.unit_of_work():
+            entity = await self.get_one(id, use_cache=False)
+            await entity.delete(self.db, commit=False)
+            await self.invalidate_entity_cache(id)
+            await self.invalidate_list_cache()
+        return entity
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """
+        Commit the session once and apply the queued cache changes after it.
+
+        Cache writes and invalidations made inside the block by any service
+        sharing the session are collected, deduplicated and sent to Redis as
+        one pipeline once the commit succeeded. On an error the session is
+        rolled back and the changes are dropped, so the cache never holds
+        uncommitted data. Nested blocks join the outermost one.
+        Yields:
+            UnitOfWork: The pending cache changes.
+        """
+        uow = UnitOfWork.current(self.db)
+        if uow is not None:
+            yield uow
+            return
+
+        uow = UnitOfWork(self.db, self.redis_service)
+        self.db.info[UNIT_OF_WORK_KEY] = uow
+        try:
+            yield uow
+            if self.db.in_transaction():
+                await self.db.commit()
+        except BaseException:
+            uow.discard()
+            await self.db.rollback()
+            raise
+        finally:
+            del self.db.info[UNIT_OF_WORK_KEY]
+        try:
+            await uow.flush()
+        except Exception:
+            # The commit stands; entries expire or are invalidated again later
+            logger.exception("Cache flush after commit failed")
+
+    async def cache_get(self, cache_key: str, local: bool = False, raw: bool = False):
+        """
+        Read a cached value from L1 (if requested) and then Redis.
+        Args:
+            cache_key (str): Redis cache key.
+            local (bool): If True, consult and fill the in-process L1 cache.
+            raw (bool): If True and the codec writes JSON, return the stored
+                bytes without decoding them.
+        Returns:
+            The decoded value (or bytes), or None on a miss.
+        """
+        data = None
+        if local:
+            data = local_cache.get(cache_key)
+            self._count_cache_lookup("l1", data is not None)
+
+        if data is None:
+            data = await self.redis_service.get_raw(cache_key)
+            self._count_cache_lookup("l2", data is not None)
+            if data is None:
+                return None
+            if local:
+                local_cache.set(cache_key, data)
+        if raw and self.raw_cache_enabled:
+            return data
+        return self.redis_service.codec.decode(data)
+
+    async def cache_get_page(self, cache_key: str, raw: bool = False):
+        """
+        Read a cached list page from Redis.
+        Raw hits carry the next cursor stored with the page, so serving
+        them never needs the JSON decoded.
+        Returns:
+            The decoded page (or a CachedPage), or None on a miss.
+        """
+        if not (raw and self.raw_cache_enabled):
+            return await self.cache_get(cache_key)
+        data, cursor = await self.redis_service.get_raw_page(cache_key)
+        # Pages cached without their cursor count as misses and are reloaded
+        hit = data is not None and cursor is not None
+        self._count_cache_lookup("l2", hit)
+        if not hit:
+            return None
+        page = CachedPage(data)
+        page.next_cursor = cursor or None
+        return page
+
+    def _count_cache_lookup(self, tier: str, hit: bool):
+        result = "hit" if hit else "miss"
+        CACHE_REQUESTS.inc(tier=tier, entity=self.entity_name, result=result)
+        record_cache(self.entity_name, tier, result)
+
+    async def cache_set(self, cache_key: str, value, local: bool = False, cursor: str = None):
+        """
+        Encode a value once and store it in Redis and, if requested, L1.
+        Its ETag is stored next to it, so conditional requests can be
+        answered without reading the value, and so is the next cursor of
+        a list page when given.
+        """
+        data = self.redis_service.codec.encode(value)
+        await self.redis_service.set_raw_with_etag(
+            cache_key, data, make_etag(data), expire=self.cache_ttl, cursor=cursor
+        )
+        if local:
+            local_cache.set(cache_key, data)
+
+    async def cache_get_etag(self, cache_key: str, local: bool = False):
+        """ETag of a cached value from its L1 copy or Redis; None if not cached."""
+        if local:
+            data = local_cache.get(cache_key)
+            if data is not None:
+                return make_etag(data)
+        return await self.redis_service.get_etag(cache_key)
+
+    async def get_etag(self, skip: int = 0, limit: int = 10, cursor: str = None):
+        """ETag of a cached list page, or None if the page isn't cached."""
+        if not self.cache_enabled:
+            return None
+        cache_key = await self.get_list_cache_key(
+            **self.get_page_params(skip, limit, cursor)
+        )
+        return await self.cache_get_etag(cache_key)
+
+    async def get_one_etag(self, id: int):
+        """ETag of a cached entity, or None if the entity isn't cached."""
+        if not self.cache_enabled:
+            return None
+        return await self.cache_get_etag(
+            self.get_cache_key(id=id), local=self.local_cache_enabled
+        )
+
+    def etag_for(self, value) -> str:
+        """ETag of a value as it is (or would be) stored in the cache."""
+        if isinstance(value, bytes):
+            return make_etag(value)
+        return make_etag(self.redis_service.codec.encode(value))
+
+    async def cache_entity(self, entity):
+        """Write an entity's serialized form to its cache key."""
+        if not self.cache_enabled:
+            return
+        cache_key = self.get_cache_key(id=entity.id)
+        data = self.redis_service.codec.encode(self.serialize(entity))
+        await self._change_cache(
+            lambda uow: uow.set(
+                cache_key, data, make_etag(data), self.cache_ttl,
+                evict=self.local_cache_enabled,
+            )
+        )
 
     async def invalidate_entity_cache(self, id: int):
         """Invalidate a single entity's cache."""
-        cache_key = self.get_cache_key(id=id)
-        await self.redis_service.clear_cache_by_key(cache_key)
+        await self.invalidate_entity_caches([id])
+
+    async def invalidate_entity_caches(self, ids):
+        """Invalidate several entities' caches with a single Redis call."""
+        if not self.cache_enabled:
+            return
+        cache_keys = [self.get_cache_key(id=id) for id in ids]
+        await self._change_cache(
+            lambda uow: uow.delete(cache_keys, evict=self.local_cache_enabled)
+        )
 
     async def invalidate_list_cache(self):
-        """Invalidate all list caches for the entity."""
-        list_pattern = f"{self.entity_name}s:*"
-        await self.redis_service.clear_cache_by_pattern(list_pattern)
+        """
+        Invalidate all list caches for the entity.
+        Bumps the generation counter so new reads use fresh keys; pages from
+        older generations are never read again and simply expire.
+        """
+        if not self.cache_enabled:
+            return
+        generation_key = self.get_generation_key()
+        await self._change_cache(lambda uow: uow.bump(generation_key))
+
+    async def _change_cache(self, change: Callable[[UnitOfWork], None]):
+        """Queue a cache change in the open unit of work, or apply it now."""
+        uow = UnitOfWork.current(self.db)
+        if uow is not None:
+            change(uow)
+            return
+        uow = UnitOfWork(self.db, self.redis_service)
+        change(uow)
+        await uow.flush()
@@ -0,0 +1,61 @@
+import json
+import msgpack
+import orjson
+
+
+class JsonCodec:
+    """Standard library JSON; the slowest option, kept for comparison."""
+
+    name = "json"
+    media_type = "application/json"
+
+    def encode(self, value) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes):
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson; output is plain JSON, so cached bytes are valid response bodies."""
+
+    name = "orjson"
+    media_type = "application/json"
+
+    def encode(self, value) -> bytes:
+        return orjson.dumps(value)
+
+    def decode(self, data: bytes):
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    """MessagePack; the most compact payloads, but not directly servable as JSON."""
+
+    name = "msgpack"
+    media_type = "application/msgpack"
+
+    def encode(self, value) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes):
+        return msgpack.unpackb(data, raw=False)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec, OrjsonCodec, MsgpackCodec)}
+
+
+def get_codec(name: str):
+    """
+    Return the cache codec registered under a name.
+    Args:
+        name (str): One of ``json``, ``orjson`` or ``msgpack``.
+    Returns:
+        Codec instance with ``encode``/``decode`` methods.
+    Raises:
+        ValueError: If the codec is unknown.
+    """
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache codec {name!r}; expected one of {sorted(CODECS)}")
@@ -0,0 +1,137 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Iterable, List
+import orjson
+from sqlalchemy import select
+from app.database.database import read_session
+from app.models.order import OrderModel
+from app.models.order_item import OrderItemModel
+from app.models.product import ProductModel
+
+# Rows fetched per round trip from the server-side cursor; also one output chunk
+EXPORT_BATCH_SIZE = 1000
+
+PRODUCT_COLUMNS = ("id", "name", "description", "price", "quantity", "category_id")
+ORDER_ITEM_COLUMNS = ("id", "product_id", "quantity", "price_at_order_time")
+ORDER_CSV_COLUMNS = (
+    "order_id", "user_id", "item_id", "product_id", "quantity", "price_at_order_time"
+)
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+class ExportService:
+    def __init__(self, format: str = "ndjson", compress: bool = False):
+        """
+        Streams whole tables as NDJSON or CSV in constant memory.
+
+        Rows come from a server-side cursor on a replica session owned by the
+        stream itself, because the request's session is closed before a
+        streaming body is sent. Plain column tuples skip ORM hydration and
+        pydantic.
+        Attributes:
+            format (str): ``ndjson`` (one JSON object per line) or ``csv``.
+            compress (bool): If True, the stream is gzip-encoded.
+        """
+        self.format = format
+        self.compress = compress
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format]
+
+    def headers(self, name: str) -> dict:
+        """Response headers for downloading the export as ``name.<format>``."""
+        headers = {"Content-Disposition": f'attachment; filename="{name}.{self.format}"'}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+        return headers
+
+    def products(self) -> AsyncIterator[bytes]:
+        """Every product ordered by ID."""
+        query = select(*[ProductModel.__table__.c[name] for name in PRODUCT_COLUMNS])
+        query = query.order_by(ProductModel.id)
+        return self._encode(self._product_chunks(query))
+
+    def orders(self) -> AsyncIterator[bytes]:
+        """
+        Every order ordered by ID, joined with its items in the same stream.
+        NDJSON nests the items in each order; CSV emits one row per item.
+        """
+        query = (
+            select(
+                OrderModel.id,
+                OrderModel.user_id,
+                OrderItemModel.id,
+                OrderItemModel.product_id,
+                OrderItemModel.quantity,
+                OrderItemModel.price_at_order_time,
+            )
+            .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+            .order_by(OrderModel.id, OrderItemModel.id)
+        )
+        return self._encode(self._order_chunks(query))
+
+    async def _partitions(self, query) -> AsyncIterator[List[tuple]]:
+        async with read_session() as session:
+            result = await session.stream(
+                query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                yield rows
+
+    async def _product_chunks(self, query) -> AsyncIterator[bytes]:
+        if self.format == "csv":
+            yield self._csv([PRODUCT_COLUMNS])
+        async for rows in self._partitions(query):
+            if self.format == "csv":
+                yield self._csv(rows)
+            else:
+                yield self._ndjson(dict(zip(PRODUCT_COLUMNS, row)) for row in rows)
+
+    async def _order_chunks(self, query) -> AsyncIterator[bytes]:
+        if self.format == "csv":
+            yield self._csv([ORDER_CSV_COLUMNS])
+            async for rows in self._partitions(query):
+                yield self._csv(rows)
+            return
+
+        # Rows arrive ordered by order ID, so an order is complete once the ID changes
+        order = None
+        async for rows in self._partitions(query):
+            done = []
+            for order_id, user_id, *item in rows:
+                if order is None or order["id"] != order_id:
+                    if order is not None:
+                        done.append(order)
+                    order = {"id": order_id, "user_id": user_id, "items": []}
+                if item[0] is not None:
+                    order["items"].append(dict(zip(ORDER_ITEM_COLUMNS, item)))
+            if done:
+                yield self._ndjson(done)
+        if order is not None:
+            yield self._ndjson([order])
+
+    async def _encode(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        if not self.compress:
+            async for chunk in chunks:
+                yield chunk
+            return
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(wbits=31)
+        async for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def _ndjson(objects: Iterable[dict]) -> bytes:
+        return b"".join(orjson.dumps(obj) + b"\n" for obj in objects)
+
+    @staticmethod
+    def _csv(rows: Iterable[tuple]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
@@ -0,0 +1,257 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional, Tuple
+from app.config import INVENTORY_LOCK_TIMEOUT
+from app.services.redis_service import RedisService
+
+COUNTER_PREFIX = "inventory:stock"
+DELTAS_KEY = "inventory:deltas"
+FLUSHING_KEY = "inventory:deltas:flushing"
+BATCH_KEY = "inventory:deltas:batch"
+LOCK_KEY = "inventory:lock"
+
+# KEYS: deltas hash, counters...  ARGV: product ids..., quantities...
+# Takes every quantity or nothing. Returns {0, remaining...} on success,
+# {-1, i} when counter i is not loaded yet, {-2, i} when it is short and
+# {-3, i} when quantity i isn't positive.
+RESERVE_SCRIPT = """
+local n = #ARGV / 2
+for i = 1, n do
+  if tonumber(ARGV[n + i]) <= 0 then
+    return {-3, i}
+  end
+  local stock = redis.call('GET', KEYS[i + 1])
+  if not stock then
+    return {-1, i}
+  end
+  if tonumber(stock) < tonumber(ARGV[n + i]) then
+    return {-2, i}
+  end
+end
+local result = {0}
+for i = 1, n do
+  result[i + 1] = redis.call('DECRBY', KEYS[i + 1], ARGV[n + i])
+  redis.call('HINCRBY', KEYS[1], ARGV[i], -tonumber(ARGV[n + i]))
+end
+return result
+"""
+
+# KEYS: deltas hash, counters...  ARGV: product ids..., quantities...
+# Unloaded counters only record the delta; seeding picks it up later.
+RELEASE_SCRIPT = """
+local n = #ARGV / 2
+local result = {}
+for i = 1, n do
+  if redis.call('EXISTS', KEYS[i + 1]) == 1 then
+    result[i] = redis.call('INCRBY', KEYS[i + 1], ARGV[n + i])
+  else
+    result[i] = false
+  end
+  redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[n + i])
+end
+return result
+"""
+
+# KEYS: deltas hash, flushing hash, counters...  ARGV: product ids..., db quantities...
+SEED_SCRIPT = """
+local n = #ARGV / 2
+for i = 1, n do
+  if redis.call('EXISTS', KEYS[i + 2]) == 0 then
+    local pending = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or 0)
+      + tonumber(redis.call('HGET', KEYS[2], ARGV[i]) or 0)
+    redis.call('SET', KEYS[i + 2], tonumber(ARGV[n + i]) + pending)
+  end
+end
+return n
+"""
+
+# KEYS: deltas hash, flushing hash, batch ID  ARGV: ID for a new batch
+# Moves the deltas aside under a new batch ID unless a batch is still
+# pending. Returns false when there is nothing to flush, else {id, hash}.
+TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+  if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+  end
+  redis.call('RENAME', KEYS[1], KEYS[2])
+  redis.call('SET', KEYS[3], ARGV[1])
+else
+  redis.call('SET', KEYS[3], ARGV[1], 'NX')
+end
+return {redis.call('GET', KEYS[3]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# KEYS: flushing hash, batch ID  ARGV: batch ID
+# Only drops the batch it was given, never one taken after it.
+FINISH_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+
+class CounterNotLoaded(Exception):
+    def __init__(self, product_id: int):
+        super().__init__(f"Inventory counter for product {product_id} is not loaded")
+        self.product_id = product_id
+
+
+class CounterShortage(Exception):
+    def __init__(self, product_id: int):
+        super().__init__(f"Insufficient stock for product {product_id}")
+        self.product_id = product_id
+
+
+class LockLost(Exception):
+    def __init__(self):
+        super().__init__("Inventory lock expired while it was held")
+
+
+class InventoryCounters:
+    def __init__(self, redis_service: RedisService):
+        """
+        Per-product stock counters kept in Redis.
+
+        A counter holds the live stock of one product. Every change is also
+        added to a pending-delta hash that the flusher writes back to
+        ``products.quantity``; seeding a counter adds any deltas not yet
+        flushed, so the counter always equals Postgres plus pending changes.
+        Attributes:
+            redis_service (RedisService): Redis service instance.
+        """
+        self.redis_service = redis_service
+
+    @staticmethod
+    def counter_key(product_id: int) -> str:
+        return f"{COUNTER_PREFIX}:{product_id}"
+
+    async def reserve(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        """
+        Atomically take every quantity or none of them.
+        Args:
+            quantities (Dict[int, int]): Amount to take per product ID.
+        Returns:
+            Dict[int, int]: Remaining stock per product ID.
+        Raises:
+            CounterNotLoaded: If a counter has to be seeded first.
+            CounterShortage: If a product lacks stock.
+            ValueError: If a quantity isn't positive.
+        """
+        ids = list(quantities)
+        result = await self._run(RESERVE_SCRIPT, ids, [quantities[id] for id in ids])
+        status = result[0]
+        if status == -3:
+            id = ids[result[1] - 1]
+            raise ValueError(
+                f"Stock change for product {id} must be positive, got {quantities[id]}"
+            )
+        if status == -1:
+            raise CounterNotLoaded(ids[result[1] - 1])
+        if status == -2:
+            raise CounterShortage(ids[result[1] - 1])
+        return dict(zip(ids, result[1:]))
+
+    async def release(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        """
+        Add quantities back without any stock check.
+        Args:
+            quantities (Dict[int, int]): Amount to add per product ID.
+        Returns:
+            Dict[int, int]: Resulting stock per loaded product ID.
+        """
+        ids = list(quantities)
+        result = await self._run(RELEASE_SCRIPT, ids, [quantities[id] for id in ids])
+        return {id: stock for id, stock in zip(ids, result) if stock is not None}
+
+    async def seed(self, quantities: Dict[int, int]):
+        """
+        Load counters that are missing from their Postgres quantities.
+        Must run under ``lock()`` so a concurrent flush can't be counted twice.
+        Args:
+            quantities (Dict[int, int]): Committed ``products.quantity`` per ID.
+        """
+        ids = list(quantities)
+        redis = await self.redis_service.redis()
+        await redis.register_script(SEED_SCRIPT)(
+            keys=[DELTAS_KEY, FLUSHING_KEY, *[self.counter_key(id) for id in ids]],
+            args=[*ids, *[quantities[id] for id in ids]],
+        )
+
+    async def forget(self, product_ids: Iterable[int]):
+        """Drop counters so they are seeded again from Postgres."""
+        await self.redis_service.clear_cache_by_keys(
+            [self.counter_key(id) for id in product_ids]
+        )
+
+    async def forget_all(self):
+        """Drop every loaded counter."""
+        await self.redis_service.clear_cache_by_pattern(f"{COUNTER_PREFIX}:*")
+
+    async def take_pending(self) -> Tuple[Optional[str], Dict[int, int]]:
+        """
+        Move pending deltas aside for flushing. Must run under ``lock()``.
+        A batch left over from a failed flush is returned again with the same
+        ID, so the flusher can tell whether Postgres already has it.
+        Returns:
+            Tuple[Optional[str], Dict[int, int]]: Batch ID, or None if nothing
+                is pending, and the net stock change per product ID.
+        """
+        redis = await self.redis_service.redis()
+        result = await redis.register_script(TAKE_SCRIPT)(
+            keys=[DELTAS_KEY, FLUSHING_KEY, BATCH_KEY], args=[uuid.uuid4().hex]
+        )
+        if not result:
+            return None, {}
+        batch_id, fields = result
+        pending = dict(zip(fields[::2], fields[1::2]))
+        return (
+            self._decode(batch_id),
+            {int(id): int(delta) for id, delta in pending.items() if int(delta)},
+        )
+
+    async def flushing_batch(self) -> Optional[str]:
+        """ID of the batch taken by ``take_pending`` and not finished yet."""
+        redis = await self.redis_service.redis()
+        batch_id = await redis.get(BATCH_KEY)
+        return self._decode(batch_id) if batch_id is not None else None
+
+    async def finish_flush(self, batch_id: str):
+        """Forget a batch returned by ``take_pending`` once it is committed."""
+        redis = await self.redis_service.redis()
+        await redis.register_script(FINISH_SCRIPT)(
+            keys=[FLUSHING_KEY, BATCH_KEY], args=[batch_id]
+        )
+
+    @asynccontextmanager
+    async def lock(self, timeout: float = INVENTORY_LOCK_TIMEOUT):
+        """Hold the lock shared by seeding and flushing; yields its token."""
+        token = await self.redis_service.acquire_lock(LOCK_KEY, timeout)
+        while token is None:
+            await asyncio.sleep(0.01)
+            token = await self.redis_service.acquire_lock(LOCK_KEY, timeout)
+        try:
+            yield token
+        finally:
+            await self.redis_service.release_lock(LOCK_KEY, token)
+
+    async def renew_lock(self, token: str, timeout: float = INVENTORY_LOCK_TIMEOUT):
+        """
+        Check the lock taken with ``token`` is still held and restart its expiry.
+        Raises:
+            LockLost: If it expired, so another process may hold it now.
+        """
+        if not await self.redis_service.extend_lock(LOCK_KEY, token, timeout):
+            raise LockLost()
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def _run(self, script: str, ids: list[int], amounts: list[int]):
+        redis = await self.redis_service.redis()
+        return await redis.register_script(script)(
+            keys=[DELTAS_KEY, *[self.counter_key(id) for id in ids]],
+            args=[*ids, *amounts],
+        )
@@ -0,0 +1,285 @@
+from contextlib import asynccontextmanager
+from typing import Dict
+from fastapi import HTTPException
+from sqlalchemy import select, update, values, column, bindparam, any_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import INVENTORY_BACKEND
+from app.models.inventory_flush_batch import InventoryFlushBatchModel
+from app.models.product import ProductModel
+from app.services.inventory_counters import (
+    InventoryCounters,
+    CounterNotLoaded,
+    CounterShortage,
+)
+from app.services.product_service import ProductService
+from app.services.redis_service import RedisService
+
+
+def check_quantities(quantities: Dict[int, int]):
+    """
+    Reject amounts that aren't positive. A negative one would pass the stock
+    check and turn a reservation into a release, or the other way around.
+    Raises:
+        ValueError: If any amount is zero or negative.
+    """
+    for product_id, quantity in quantities.items():
+        if quantity <= 0:
+            raise ValueError(
+                f"Stock change for product {product_id} must be positive, got {quantity}"
+            )
+
+
+class InventoryService:
+    def __init__(self, db: AsyncSession, redis_service: RedisService = None):
+        """
+        Atomic stock changes shared by orders and reservations.
+
+        Every decrement is a single conditional UPDATE, so concurrent
+        checkouts can never oversell a product. Changes join the caller's
+        transaction and are committed (or rolled back) with it.
+        Attributes:
+            db (AsyncSession): Async SQLAlchemy session.
+            redis_service (RedisService): Passed on to the product service.
+            product_service (ProductService): Used to drop stale product caches.
+            touched_ids (set[int]): Products changed since the last invalidation.
+            journal (Dict[int, int]): Net stock taken per product inside
+                ``guard()``, for backends that can't roll back with the session.
+        """
+        self.db = db
+        self.product_service = ProductService(db, redis_service)
+        self.touched_ids: set[int] = set()
+        self.journal: Dict[int, int] = {}
+
+    @asynccontextmanager
+    async def guard(self):
+        """Undo stock changes kept outside the database if the block fails."""
+        try:
+            yield
+        except BaseException:
+            await self.rollback()
+            raise
+        finally:
+            self.journal.clear()
+
+    async def rollback(self):
+        """Database changes roll back with the caller's transaction."""
+        pass
+
+    async def reserve(self, product_id: int, quantity: int) -> int:
+        """
+        Take stock from a single product if enough is available.
+        Args:
+            product_id (int): Product ID.
+            quantity (int): Amount to take.
+        Returns:
+            int: Remaining stock of the product.
+        Raises:
+            HTTPException: If the product doesn't exist or lacks stock.
+        """
+        remaining = await self.reserve_many({product_id: quantity})
+        return remaining[product_id]
+
+    async def reserve_many(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        """
+        Take stock from several products in one statement, all or nothing.
+        Args:
+            quantities (Dict[int, int]): Amount to take per product ID.
+        Returns:
+            Dict[int, int]: Remaining stock per product ID.
+        Raises:
+            HTTPException: If any product doesn't exist or lacks stock. Rows
+                already decremented by the statement are undone when the
+                caller's transaction rolls back.
+            ValueError: If an amount isn't positive.
+        """
+        check_quantities(quantities)
+        if not quantities:
+            return {}
+        if len(quantities) == 1:
+            [(product_id, quantity)] = quantities.items()
+            query = (
+                update(ProductModel)
+                .where(ProductModel.id == product_id, ProductModel.quantity >= quantity)
+                .values(quantity=ProductModel.quantity - quantity)
+                .returning(ProductModel.id, ProductModel.quantity)
+                .execution_options(synchronize_session=False)
+            )
+        else:
+            # Sorted so concurrent multi-product orders lock rows in the same order
+            requested = values(
+                column("id", Integer), column("quantity", Integer), name="requested"
+            ).data(sorted(quantities.items()))
+            query = (
+                update(ProductModel)
+                .where(
+                    ProductModel.id == requested.c.id,
+                    ProductModel.quantity >= requested.c.quantity,
+                )
+                .values(quantity=ProductModel.quantity - requested.c.quantity)
+                .returning(ProductModel.id, ProductModel.quantity)
+                .execution_options(synchronize_session=False)
+            )
+        result = await self.db.execute(query)
+        remaining = dict(result.all())
+        if len(remaining) != len(quantities):
+            await self._raise_for_shortage(quantities, remaining)
+        self.touched_ids.update(remaining)
+        return remaining
+
+    async def release(self, product_id: int, quantity: int) -> int:
+        """
+        Return stock to a single product.
+        Args:
+            product_id (int): Product ID.
+            quantity (int): Amount to return.
+        Returns:
+            int: Resulting stock of the product.
+        """
+        remaining = await self.release_many({product_id: quantity})
+        return remaining.get(product_id)
+
+    async def release_many(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        """
+        Return stock to several products in one statement.
+        Args:
+            quantities (Dict[int, int]): Amount to return per product ID.
+        Returns:
+            Dict[int, int]: Resulting stock per product ID.
+        Raises:
+            ValueError: If an amount isn't positive.
+        """
+        check_quantities(quantities)
+        if not quantities:
+            return {}
+        released = values(
+            column("id", Integer), column("quantity", Integer), name="released"
+        ).data(sorted(quantities.items()))
+        query = (
+            update(ProductModel)
+            .where(ProductModel.id == released.c.id)
+            .values(quantity=ProductModel.quantity + released.c.quantity)
+            .returning(ProductModel.id, ProductModel.quantity)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(query)
+        remaining = dict(result.all())
+        self.touched_ids.update(remaining)
+        return remaining
+
+    async def invalidate_cache(self):
+        """Drop cached copies of every product changed so far."""
+        if not self.touched_ids:
+            return
+        await self.product_service.invalidate_entity_caches(self.touched_ids)
+        await self.product_service.invalidate_list_cache()
+        self.touched_ids.clear()
+
+    async def _raise_for_shortage(self, quantities: Dict[int, int], updated: Dict[int, int]):
+        """Explain why a conditional decrement did not match every product."""
+        failed_ids = sorted(set(quantities) - set(updated))
+        query = select(ProductModel.id, ProductModel.name).where(
+            ProductModel.id == any_(bindparam("ids", failed_ids, type_=ARRAY(Integer)))
+        )
+        result = await self.db.execute(query)
+        names = dict(result.all())
+        for product_id in failed_ids:
+            if product_id not in names:
+                raise HTTPException(
+                    status_code=404, detail=f"Product with ID {product_id} not found."
+                )
+        product_id = failed_ids[0]
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient stock for product {names[product_id]} (ID: {product_id})",
+        )
+
+
+class RedisInventoryService(InventoryService):
+    """
+    Inventory kept in Redis counters for flash-sale traffic.
+
+    Checks and decrements run in a Lua script, so hot products never
+    contend for Postgres row locks. ``products.quantity`` catches up when
+    the flusher writes the pending deltas back, and product caches are
+    invalidated there.
+    """
+
+    def __init__(self, db: AsyncSession, redis_service: RedisService = None):
+        super().__init__(db, redis_service)
+        self.counters = InventoryCounters(self.product_service.redis_service)
+
+    async def reserve_many(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        check_quantities(quantities)
+        if not quantities:
+            return {}
+        try:
+            remaining = await self._reserve_loaded(quantities)
+        except CounterShortage as ex:
+            product = await self.db.get(ProductModel, ex.product_id)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for product {product.name} (ID: {product.id})",
+            )
+        self._record(quantities)
+        return remaining
+
+    async def release_many(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        check_quantities(quantities)
+        if not quantities:
+            return {}
+        remaining = await self.counters.release(quantities)
+        self._record({id: -n for id, n in quantities.items()})
+        return remaining
+
+    async def invalidate_cache(self):
+        """Product rows change only when the flusher runs."""
+        self.touched_ids.clear()
+
+    async def rollback(self):
+        """Give back everything taken inside the failed ``guard()`` block."""
+        # The journal holds amounts taken, so releasing them puts them back
+        undo = {id: n for id, n in self.journal.items() if n}
+        if undo:
+            await self.counters.release(undo)
+
+    async def _reserve_loaded(self, quantities: Dict[int, int]) -> Dict[int, int]:
+        try:
+            return await self.counters.reserve(quantities)
+        except CounterNotLoaded:
+            await self._seed(quantities.keys())
+            return await self.counters.reserve(quantities)
+
+    async def _seed(self, product_ids):
+        """Load missing counters from the committed product quantities."""
+        ids = sorted(product_ids)
+        async with self.counters.lock():
+            batch_id = await self.counters.flushing_batch()
+            if batch_id is not None and await self.db.get(InventoryFlushBatchModel, batch_id):
+                # Committed by a flush that died before clearing it from
+                # Redis; seeding would count it on top of Postgres again
+                await self.counters.finish_flush(batch_id)
+            query = select(ProductModel.id, ProductModel.quantity).where(
+                ProductModel.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+            )
+            result = await self.db.execute(query)
+            quantities = dict(result.all())
+            for product_id in ids:
+                if product_id not in quantities:
+                    raise HTTPException(
+                        status_code=404, detail=f"Product with ID {product_id} not found."
+                    )
+            await self.counters.seed(quantities)
+
+    def _record(self, quantities: Dict[int, int]):
+        for product_id, quantity in quantities.items():
+            self.journal[product_id] = self.journal.get(product_id, 0) + quantity
+
+
+def get_inventory_service(
+    db: AsyncSession, redis_service: RedisService = None
+) -> InventoryService:
+    """Return the inventory backend selected by ``INVENTORY_BACKEND``."""
+    if INVENTORY_BACKEND == "redis":
+        return RedisInventoryService(db, redis_service)
+    return InventoryService(db, redis_service)
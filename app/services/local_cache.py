@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from app.config import LOCAL_CACHE_MAX_SIZE, LOCAL_CACHE_TTL
+from app.metrics import Gauge
+
+
+class LocalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Bounded in-process LRU cache with a per-entry TTL.
+
+        Holds encoded cache payloads in front of Redis. The TTL bounds how
+        stale an entry can get if an invalidation message is ever missed.
+        Attributes:
+            maxsize (int): Maximum number of entries before LRU eviction.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# One L1 cache per worker process
+local_cache = LocalCache(LOCAL_CACHE_MAX_SIZE, LOCAL_CACHE_TTL)
+
+Gauge(
+    "local_cache_entries",
+    "Entries currently held in the in-process L1 cache.",
+    callback=lambda: len(local_cache),
+)
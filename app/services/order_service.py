@@ -1,231 +1,182 @@
 import logging
 from fastapi import HTTPException
 from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import select, insert, bindparam, any_, Integer
 from app.models.order import OrderModel
+from app.models.product import ProductModel
 from app.models.order_item import OrderItemModel
-from schemas.orders import Order, OrderUpdate, OrderCreate, OrderItem
-from app.schemas.products import Product, ProductUpdate
-from app.services.product_service import ProductService
+from schemas.orders import Order, OrderUpdate, OrderCreate, OrderItem, OrderItemCreate
+from app.services.inventory_service import get_inventory_service
 from app.services.base_service import BaseService
-from typing import List
+from app.services.redis_service import RedisService
+from typing import Dict, Iterable, List
 
 logger = logging.getLogger(__name__)
 
 
 class OrderService(BaseService):
-    def __init__(self, db: AsyncSession):
-        super().__init__(db)
-        self.product_service = ProductService(db)
-
-    async def get(self, skip: int = 0, limit: int = 10):
-        """Retrieve a paginated list of orders with their items."""
-        cache_key = self.get_cache_key(is_list=True, skip=skip, limit=limit)
-        cached_orders = await self.redis_service.get_json(cache_key)
-        if cached_orders:
-            logger.info(f"Cache hit for orders: skip={skip}, limit={limit}")
-            return cached_orders
-
-        # Query paginated orders and load items
-        query = (
-            select(OrderModel)
-            .offset(skip)
-            .limit(limit)
-            .options(selectinload(OrderModel.items))
-        )
-        db_order = await self.db.execute(query)
-        orders = db_order.scalars().all()
-
-        # Serialize and cache the result
-        serialized_orders = [await self._serialize_order(order) for order in orders]
-        await self.redis_service.set_json(
-            cache_key, serialized_orders, expire=3600
-        )  # Cache for 1 hour
-        return orders
-
-    async def get_one(self, id: int, use_cache=True):
-        """Retrieve a single order by ID with its items."""
-        cache_key = self.get_cache_key(id=id)
-        if use_cache:
-            cached_order = await self.redis_service.get_json(cache_key)
-            if cached_order:
-                logger.info(f"Cache hit for order id={id}")
-                return cached_order
-
-        # Query the order and load items
-        query = (
-            select(OrderModel)
-            .where(OrderModel.id == id)
-            .options(selectinload(OrderModel.items))
-        )
-        db_order = await self.db.execute(query)
-        order = db_order.scalar()
-        if not order:
-            raise HTTPException(
-                status_code=404, detail=f"Order with ID {id} not found."
-            )
+    model = OrderModel
+    schema = Order
+    cache_ttl = 3600
 
-        # Serialize and cache the result
-        serialized_order = await self._serialize_order(order)
-        await self.redis_service.set_json(cache_key, serialized_order, expire=3600)
-        return order
+    def __init__(self, db: AsyncSession, redis_service: RedisService = None):
+        super().__init__(db, redis_service)
+        self.inventory_service = get_inventory_service(db, self.redis_service)
+
+    def get_query(self):
+        """Orders are always loaded together with their items."""
+        return select(OrderModel).options(selectinload(OrderModel.items))
 
     async def create(self, obj: OrderCreate):
         """Create a new order with items."""
         logger.info(f"Creating order for user_id={obj.user_id} with items={obj.items}")
+        quantities = self._aggregate_quantities(obj.items)
         db_order = OrderModel(user_id=obj.user_id)
 
-        # Process items and save the order
-        async with self.db.begin():
-            await self._process_order_items(db_order, obj.items)
+        # Reserve stock for all products and save the order in one transaction
+        async with self.inventory_service.guard(), self.unit_of_work():
+            await self.inventory_service.reserve_many(quantities)
+            prices = await self._fetch_prices(quantities.keys())
             self.db.add(db_order)
-            await self.db.commit()
-            await self.db.refresh(db_order)
-
-        # Cache the created order
-        await self._cache_order(db_order)
-
-        # Invalidate the order list cache
-        await self.invalidate_list_cache()
+            await self.db.flush()
+            items = await self._insert_order_items(db_order.id, quantities, prices)
+            set_committed_value(db_order, "items", items)
 
-        return await self._serialize_order(db_order)
+            # Cache the created order and invalidate the touched products and
+            # the order list cache once the transaction commits
+            await self.cache_entity(db_order)
+            await self.inventory_service.invalidate_cache()
+            await self.invalidate_list_cache()
 
-    async def _cache_order(self, db_order: OrderModel):
-        """Cache the created or updated order."""
-        cache_key = self.get_cache_key(id=db_order.id)
-        serialized_order = await self._serialize_order(db_order)
-        await self.redis_service.set_json(cache_key, serialized_order)
+        return self.serialize(db_order)
 
     async def update(self, id: int, obj: OrderUpdate):
         """Update an existing order and its items."""
         logger.info(f"Updating order id={id} with items={obj.items}")
-        db_order = await self.get_one(id, use_cache=False)
-        db_order_items = {item.product_id: item for item in db_order.items}
-
-        # Handle updates or additions
-        for updated_item in obj.items:
-            if updated_item.product_id in db_order_items:
-                await self._update_existing_item(
-                    db_order_items[updated_item.product_id], updated_item
-                )
-            else:
-                await self._add_new_item(db_order, updated_item)
-
-        # Remove items not in the update
-        updated_product_ids = {item.product_id for item in obj.items}
-        await self._remove_items_not_in_update(db_order, updated_product_ids)
+        if obj.items is None:
+            return self.serialize(await self.get_one(id, use_cache=False))
+
+        async with self.inventory_service.guard(), self.unit_of_work():
+            # The row lock makes concurrent updates of this order compute
+            # their stock changes one after the other
+            db_order = await self.get_for_update(id)
+            lines: Dict[int, List[OrderItemModel]] = {}
+            for item in db_order.items:
+                lines.setdefault(item.product_id, []).append(item)
+            current = self._aggregate_quantities(db_order.items)
+            requested = self._aggregate_quantities(obj.items)
+
+            # Apply the net stock change per product with one statement each way
+            diffs = {
+                product_id: requested.get(product_id, 0) - current.get(product_id, 0)
+                for product_id in current.keys() | requested.keys()
+            }
+            await self.inventory_service.reserve_many(
+                {product_id: diff for product_id, diff in diffs.items() if diff > 0}
+            )
+            await self.inventory_service.release_many(
+                {product_id: -diff for product_id, diff in diffs.items() if diff < 0}
+            )
 
-        self.db.add(db_order)
-        await self.db.commit()
+            # Leave one line per requested product, dropping duplicate lines
+            # and the products no longer ordered
+            new_ids = requested.keys() - lines.keys()
+            prices = await self._fetch_prices(new_ids) if new_ids else {}
+            for product_id, quantity in requested.items():
+                if product_id in lines:
+                    first, *duplicates = lines[product_id]
+                    first.quantity = quantity
+                    for item in duplicates:
+                        db_order.items.remove(item)
+                else:
+                    db_order.items.append(
+                        OrderItemModel(
+                            product_id=product_id,
+                            quantity=quantity,
+                            price_at_order_time=prices[product_id],
+                        )
+                    )
+            for product_id in lines.keys() - requested.keys():
+                for item in lines[product_id]:
+                    db_order.items.remove(item)
 
-        # Cache the updated order
-        await self._cache_order(db_order)
+            self.db.add(db_order)
+            await self.db.flush()
 
-        # Invalidate the order list cache
-        await self.invalidate_list_cache()
+            # Cache the updated order and invalidate the touched products and
+            # the order list cache once the transaction commits
+            await self.cache_entity(db_order)
+            await self.inventory_service.invalidate_cache()
+            await self.invalidate_list_cache()
 
-        return await self._serialize_order(db_order)
+        return self.serialize(db_order)
 
     async def delete(self, id: int):
         """Delete an order and restore stock for its items."""
         logger.info(f"Deleting order id={id}")
-        db_order = await self.get_one(id, use_cache=False)
-        for item in db_order.items:
-            await self._adjust_product_stock(
-                item.product_id, quantity_diff=item.quantity
+        async with self.inventory_service.guard(), self.unit_of_work():
+            # A concurrent delete waits on the lock and then finds no order,
+            # so the stock is returned once
+            db_order = await self.get_for_update(id)
+            await self.inventory_service.release_many(
+                self._aggregate_quantities(db_order.items)
             )
-        await self.db.delete(db_order)
-        await self.db.commit()
+            await self.db.delete(db_order)
 
-        # Invalidate the order list cache
-        await self.invalidate_list_cache()
+            # Invalidate the touched products, the order and the order list
+            # cache once the transaction commits
+            await self.inventory_service.invalidate_cache()
+            await self.invalidate_entity_cache(id)
+            await self.invalidate_list_cache()
 
         return db_order
 
-    async def _process_order_items(self, db_order: OrderModel, items: List[dict]):
-        """Validate and process order items, including stock updates."""
+    @staticmethod
+    def _aggregate_quantities(items: Iterable[OrderItemCreate]) -> Dict[int, int]:
+        """Sum quantities per product, merging duplicate lines."""
+        quantities: Dict[int, int] = {}
         for item in items:
-            product = await self._fetch_and_validate_product(
-                item.product_id, item.quantity
-            )
-            product.quantity -= item.quantity
-            await self.product_service.update(
-                product.id, ProductUpdate(**product.model_dump())
+            quantities[item.product_id] = (
+                quantities.get(item.product_id, 0) + item.quantity
             )
-            db_order.items.append(
-                OrderItemModel(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    price_at_order_time=product.price,
-                )
-            )
-
-    async def _update_existing_item(
-        self, existing_item: OrderItemModel, updated_item: OrderItem
-    ):
-        """Update an existing order item."""
-        quantity_diff = existing_item.quantity - updated_item.quantity
-        await self._adjust_product_stock(
-            existing_item.product_id, quantity_diff=quantity_diff
-        )
-
-        # Modify and track the item
-        existing_item.quantity = updated_item.quantity
-        self.db.add(existing_item)  # Explicitly track changes in the session
+        return quantities
 
-    async def _add_new_item(self, db_order: OrderModel, new_item: OrderItem):
-        """Add a new order item to the order."""
-        product = await self._fetch_and_validate_product(
-            new_item.product_id, new_item.quantity
+    async def _fetch_prices(self, product_ids: Iterable[int]) -> Dict[int, float]:
+        """Look up the current price of several products with one query."""
+        ids = sorted(product_ids)
+        query = select(ProductModel.id, ProductModel.price).where(
+            ProductModel.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
         )
-        db_order.items.append(
-            OrderItemModel(
-                product_id=new_item.product_id,
-                quantity=new_item.quantity,
-                price_at_order_time=product.price,
-            )
-        )
-
-    async def _remove_items_not_in_update(
-        self, db_order: OrderModel, updated_product_ids: set[int]
-    ):
-        """Remove items no longer part of the updated order."""
-        for item in db_order.items[:]:
-            if item.product_id not in updated_product_ids:
-                await self._adjust_product_stock(
-                    item.product_id, quantity_diff=item.quantity
+        result = await self.db.execute(query)
+        prices = dict(result.all())
+        for product_id in ids:
+            if product_id not in prices:
+                raise HTTPException(
+                    status_code=404, detail=f"Product with ID {product_id} not found."
                 )
-                await self.db.delete(item)
-
-    async def _adjust_product_stock(self, product_id: int, quantity_diff: int):
-        """Adjust product stock by a given quantity difference."""
-        if quantity_diff == 0:
-            return
-        product = await self.product_service.get_one(product_id, use_cache=False)
-        product = Product.model_validate(product)
-        if product.quantity + quantity_diff < 0:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient stock for product {product.name} (ID: {product.id})",
-            )
-        product.quantity += quantity_diff
-        await self.product_service.update(
-            product_id, ProductUpdate(**product.model_dump())
-        )
-
-    async def _serialize_order(self, db_order: OrderModel) -> dict:
-        """Convert an order and its items to a dictionary."""
-        return {
-            "id": db_order.id,
-            "user_id": db_order.user_id,
-            "items": [
-                {
-                    "id": item.id,
-                    "product_id": item.product_id,
-                    "quantity": item.quantity,
-                    "price_at_order_time": item.price_at_order_time,
-                }
-                for item in db_order.items
-            ],
-        }
+        return prices
+
+    async def _insert_order_items(
+        self,
+        order_id: int,
+        quantities: Dict[int, int],
+        prices: Dict[int, float],
+    ) -> List[OrderItemModel]:
+        """Insert one line per product with a single multi-row INSERT ... RETURNING."""
+        rows = [
+            {
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "price_at_order_time": prices[product_id],
+            }
+            for product_id, quantity in quantities.items()
+        ]
+        if not rows:
+            # An empty executemany would INSERT DEFAULT VALUES
+            return []
+        result = await self.db.scalars(insert(OrderItemModel).returning(OrderItemModel), rows)
+        return list(result.all())
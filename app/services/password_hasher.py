@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE
+from app.metrics import Gauge
+from app.utils import hash_password, verify_and_update_password
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int):
+        """
+        Runs bcrypt in a dedicated thread pool so it never blocks the event loop.
+
+        bcrypt releases the GIL, so a few threads hash in parallel while the
+        loop keeps serving other requests. Calls beyond the pool size wait in
+        a bounded queue; past that they are rejected instead of piling up.
+        Attributes:
+            workers (int): Number of hashing threads.
+            queue_size (int): Calls allowed to wait for a free thread.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hasher"
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Verify a password off the loop.
+        Returns:
+            tuple[bool, str | None]: Whether it matched, and a new hash to
+            store when the existing one uses a weaker cost factor.
+        """
+        return await self._run(verify_and_update_password, password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.workers + self.queue_size:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+
+# One hashing pool per worker process
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE)
+
+Gauge(
+    "password_hash_pending",
+    "Password hash/verify calls running or queued in the bcrypt pool.",
+    callback=lambda: password_hasher.pending,
+)
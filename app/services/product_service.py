@@ -1,75 +1,317 @@
-from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from app.models import ProductModel
-from schemas.products import ProductCreate, ProductUpdate, Product
-from sqlalchemy import select, delete
+import hashlib
+from typing import Dict, List, Optional, Type
+import orjson
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import (
+    select, insert, update, values, column, literal_column, bindparam, any_, func, or_,
+    Integer,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.models import ProductModel, CategoryModel
+from schemas.products import ProductCreate, ProductUpdate, ProductBulkUpdate, Product
+from app.config import INVENTORY_BACKEND
 from app.services.base_service import BaseService
+from app.services.inventory_counters import InventoryCounters
+
+# Rows per UPDATE ... FROM (VALUES ...) statement in bulk updates
+BULK_BATCH_SIZE = 1000
+
+# Text search configuration used by the products.search_vector column; inlined
+# so the planner sees the same constant as the generated column
+SEARCH_CONFIG = literal_column("'english'::regconfig")
 
 
 class ProductService(BaseService):
-    async def get(self, skip: int = 0, limit: int = 10):
-        cache_key = self.get_cache_key(is_list=True, skip=skip, limit=limit)
+    model = ProductModel
+    schema = Product
+    cache_ttl = 3600
+    use_local_cache = True
+
+    async def update(self, id: int, obj: ProductUpdate):
+        db_product = await super().update(id, obj)
+        if obj.quantity is not None:
+            await self.forget_inventory_counters([id])
+        return db_product
 
-        cached_products = await self.redis_service.get_json(cache_key)
+    async def delete(self, id: int):
+        product = await super().delete(id)
+        await self.forget_inventory_counters([id])
+        return product
 
-        if cached_products:
-            return cached_products
+    async def search(
+        self,
+        q: Optional[str] = None,
+        category_id: Optional[int] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: bool = False,
+        skip: int = 0,
+        limit: int = 10,
+    ) -> dict:
+        """
+        Search products with filters and per-category facet counts.
 
-        query = select(ProductModel).offset(skip).limit(limit)
-        db_product = await self.db.execute(query)
-        products = db_product.scalars().all()
+        ``q`` matches the GIN-indexed ``search_vector`` (name and description)
+        or, for typos, the trigram index on ``name``; results are ranked by
+        the better of the two scores. Facets apply every filter except the
+        category one, so clients can show counts for the other categories.
+        Results are cached in the current product list generation.
+        Args:
+            q (str): Free-text query in web search syntax.
+            category_id (int): Only products in this category.
+            min_price (float): Lowest price, inclusive.
+            max_price (float): Highest price, inclusive.
+            in_stock (bool): If True, only products with quantity above zero.
+            skip (int): Number of results to skip.
+            limit (int): Maximum number of results to return.
+        Returns:
+            dict: ``items``, ``total`` matches and category ``facets``.
+        """
+        q = (q or "").strip() or None
+        params = {
+            "q": q, "category_id": category_id, "min_price": min_price,
+            "max_price": max_price, "in_stock": in_stock, "skip": skip, "limit": limit,
+        }
+        digest = hashlib.sha1(orjson.dumps(params)).hexdigest()
+        cache_key = await self.get_list_cache_key(search=digest)
+        cached = await self.cache_get(cache_key)
+        if cached is not None:
+            return cached
 
-        await self.redis_service.set_json(
-            cache_key,
-            [Product.model_validate(product).model_dump_json() for product in products],
-        )
-        return products
+        async def load():
+            result = await self._search(**params)
+            await self.cache_set(cache_key, result)
+            return result
 
-    async def get_one(self, id: int, use_cache=True):
-        cache_key = self.get_cache_key(id=id)
-        if use_cache:
-            cached_product = await self.redis_service.get_json(cache_key)
+        return await self.load_through(cache_key, load)
 
-            if cached_product:
-                return cached_product
+    async def _search(
+        self, q, category_id, min_price, max_price, in_stock, skip, limit
+    ) -> dict:
+        conditions = []
+        rank = None
+        if q:
+            tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+            conditions.append(
+                or_(
+                    ProductModel.search_vector.op("@@")(tsquery),
+                    ProductModel.name.op("%")(q),
+                )
+            )
+            rank = func.greatest(
+                func.ts_rank_cd(ProductModel.search_vector, tsquery),
+                func.similarity(ProductModel.name, q),
+            )
+        if min_price is not None:
+            conditions.append(ProductModel.price >= min_price)
+        if max_price is not None:
+            conditions.append(ProductModel.price <= max_price)
+        if in_stock:
+            conditions.append(ProductModel.quantity > 0)
 
-        product = await self.get_entity_or_404(ProductModel, id)
-        await self.redis_service.set_json(
-            cache_key, Product.model_validate(product).model_dump_json()
+        facet_query = (
+            select(ProductModel.category_id, func.count())
+            .where(*conditions)
+            .group_by(ProductModel.category_id)
+            .order_by(func.count().desc(), ProductModel.category_id)
         )
-        return product
+        facets = [
+            {"category_id": id, "count": count}
+            for id, count in (await self.db.execute(facet_query)).all()
+        ]
+        if category_id is not None:
+            conditions.append(ProductModel.category_id == category_id)
+            total = sum(f["count"] for f in facets if f["category_id"] == category_id)
+        else:
+            total = sum(f["count"] for f in facets)
 
-    async def create(self, obj: ProductCreate):
-        db_product = ProductModel(**obj.model_dump())
-        await db_product.save(self.db)
+        query = self.get_query().where(*conditions)
+        if rank is not None:
+            query = query.order_by(rank.desc(), ProductModel.id)
+        else:
+            query = query.order_by(ProductModel.id)
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        items = [self.serialize(product) for product in result.scalars().all()]
+        return {"items": items, "total": total, "facets": facets}
 
-        cache_key = self.get_cache_key(id=db_product.id)
-        await self.redis_service.set_json(
-            cache_key,
-            Product.model_validate(db_product).model_dump_json(),
-        )
+    async def bulk_create(self, rows: List[dict]) -> dict:
+        """
+        Insert many products in one transaction.
 
-        await self.invalidate_list_cache()
+        Invalid rows and rows pointing at a missing category are reported and
+        skipped; the rest go in with batched multi-row INSERT ... RETURNING.
+        Args:
+            rows (List[dict]): Raw ``ProductCreate`` payloads.
+        Returns:
+            dict: ``items`` with the new ID per input index, ``errors`` per
+            rejected input index.
+        """
+        valid, errors = self._validate_rows(rows, ProductCreate)
+        created = []
+        if valid:
+            async with self.unit_of_work():
+                valid = await self._check_categories(valid, errors)
+                if valid:
+                    ids = await self.db.scalars(
+                        insert(ProductModel).returning(
+                            ProductModel.id, sort_by_parameter_order=True
+                        ),
+                        [obj.model_dump() for _, obj in valid],
+                    )
+                    created = [
+                        {"index": index, "id": id}
+                        for (index, _), id in zip(valid, ids.all())
+                    ]
+                    await self.invalidate_list_cache()
+        return {"items": created, "errors": sorted(errors, key=lambda e: e["index"])}
 
-        return db_product
+    async def bulk_update(self, rows: List[dict]) -> dict:
+        """
+        Partially update many products by ID in one transaction.
 
-    async def update(self, id: int, obj: ProductUpdate):
-        db_product = await self.get_one(id, use_cache=False)
-        await db_product.update(self.db, **obj.dict(exclude_unset=True))
+        Rows setting the same fields share one UPDATE ... FROM (VALUES ...)
+        statement per batch; unknown IDs, duplicate IDs and missing
+        categories are reported per row. Rows that set no field, or only
+        values the product already has, are listed as unchanged.
+        Args:
+            rows (List[dict]): Raw ``ProductBulkUpdate`` payloads.
+        Returns:
+            dict: ``items`` with the ID per updated input index,
+            ``unchanged`` per input index that changed nothing, ``errors``
+            per rejected input index.
+        """
+        valid, errors = self._validate_rows(rows, ProductBulkUpdate)
+        seen = set()
+        unique = []
+        for index, obj in valid:
+            if obj.id in seen:
+                errors.append({"index": index, "detail": f"Duplicate product ID {obj.id}"})
+                continue
+            seen.add(obj.id)
+            unique.append((index, obj))
 
-        updated_product = Product.model_validate(db_product).model_dump_json()
-        cache_key = self.get_cache_key(id=id)
-        await self.redis_service.set_json(cache_key, updated_product)
+        updated, unchanged = [], []
+        if unique:
+            async with self.unit_of_work():
+                unique = await self._check_products(unique, errors)
+                unique = await self._check_categories(unique, errors)
+                groups: Dict[tuple, list] = {}
+                for index, obj in unique:
+                    changes = obj.model_dump(exclude_unset=True, exclude={"id"})
+                    groups.setdefault(tuple(sorted(changes)), []).append((obj.id, changes))
+                changed_ids = set()
+                for fields, group in groups.items():
+                    if not fields:
+                        continue
+                    for start in range(0, len(group), BULK_BATCH_SIZE):
+                        changed_ids |= await self._update_batch(
+                            fields, group[start:start + BULK_BATCH_SIZE]
+                        )
+                for index, obj in unique:
+                    result = updated if obj.id in changed_ids else unchanged
+                    result.append({"index": index, "id": obj.id})
+                if updated:
+                    await self.invalidate_entity_caches([item["id"] for item in updated])
+                    await self.invalidate_list_cache()
 
-        await self.invalidate_list_cache()
+        if updated:
+            await self.forget_inventory_counters(
+                [
+                    obj.id for _, obj in unique
+                    if obj.id in changed_ids and obj.quantity is not None
+                ]
+            )
+        return {
+            "items": updated,
+            "unchanged": unchanged,
+            "errors": sorted(errors, key=lambda e: e["index"]),
+        }
 
-        return db_product
+    async def forget_inventory_counters(self, ids):
+        """Reseed Redis stock counters after quantities were set directly."""
+        if INVENTORY_BACKEND == "redis" and ids:
+            await InventoryCounters(self.redis_service).forget(ids)
 
-    async def delete(self, id: int):
-        product = await self.get_one(id, use_cache=False)
-        await product.delete(self.db)
+    @staticmethod
+    def _validate_rows(rows: List[dict], schema: Type[BaseModel]):
+        """Validate each row on its own so one bad row doesn't reject the batch."""
+        valid, errors = [], []
+        for index, row in enumerate(rows):
+            try:
+                valid.append((index, schema.model_validate(row)))
+            except ValidationError as ex:
+                detail = "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                    for error in ex.errors()
+                )
+                errors.append({"index": index, "detail": detail})
+        return valid, errors
 
-        await self.invalidate_entity_cache(id)
-        await self.invalidate_list_cache()
+    async def _check_products(self, rows: list, errors: list) -> list:
+        """Drop rows whose product doesn't exist."""
+        ids = [obj.id for _, obj in rows]
+        existing = set(
+            await self.db.scalars(
+                select(ProductModel.id).where(
+                    ProductModel.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+                )
+            )
+        )
+        return self._keep(
+            rows, errors, lambda obj: obj.id in existing,
+            lambda obj: f"Product with ID {obj.id} not found.",
+        )
 
-        return product
+    async def _check_categories(self, rows: list, errors: list) -> list:
+        """Drop rows that reference a missing category."""
+        ids = sorted({obj.category_id for _, obj in rows if obj.category_id is not None})
+        if not ids:
+            return rows
+        existing = set(
+            await self.db.scalars(
+                select(CategoryModel.id).where(
+                    CategoryModel.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+                )
+            )
+        )
+        return self._keep(
+            rows, errors,
+            lambda obj: obj.category_id is None or obj.category_id in existing,
+            lambda obj: f"Category with ID {obj.category_id} not found.",
+        )
+
+    @staticmethod
+    def _keep(rows: list, errors: list, check, detail) -> list:
+        kept = []
+        for index, obj in rows:
+            if check(obj):
+                kept.append((index, obj))
+            else:
+                errors.append({"index": index, "detail": detail(obj)})
+        return kept
+
+    async def _update_batch(self, fields: tuple, batch: list) -> set[int]:
+        """Apply one batch of changes; returns the IDs of rows that differed."""
+        table = ProductModel.__table__
+        changes = values(
+            column("id", Integer),
+            *[column(field, table.c[field].type) for field in fields],
+            name="changes",
+        ).data(
+            [
+                (id, *[row[field] for field in fields])
+                for id, row in sorted(batch, key=lambda item: item[0])
+            ]
+        )
+        result = await self.db.execute(
+            update(ProductModel)
+            .where(
+                ProductModel.id == changes.c.id,
+                # Rows already holding these values aren't rewritten
+                or_(*[table.c[field].is_distinct_from(changes.c[field]) for field in fields]),
+            )
+            .values({field: changes.c[field] for field in fields})
+            .returning(ProductModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        return set(result.scalars())
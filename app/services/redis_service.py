@@ -1,47 +1,210 @@
-from aioredis import Redis, from_url
-from config import REDIS_URL, REDIS_PASSWORD
-import json
+from aioredis import Redis, BlockingConnectionPool
+from aioredis.client import Pipeline
+from config import (
+    REDIS_URL,
+    REDIS_PASSWORD,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_CONNECT_TIMEOUT,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    CACHE_CODEC,
+)
+from app.instrumentation import record_redis
+from app.services.cache_codec import get_codec
+import asyncio
+import secrets
+import time
+
+# One bounded client per worker process, shared by every RedisService
+_client: Redis = None
+
+UNLOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline that reports each batch as one timed Redis round trip."""
+
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            record_redis(time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """Client that reports every command's round trip to the request stats."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            record_redis(time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+def init_redis() -> Redis:
+    """Create the process-wide Redis client and its connection pool."""
+    global _client
+    if _client is None:
+        pool = BlockingConnectionPool.from_url(
+            REDIS_URL,
+            password=REDIS_PASSWORD or None,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        )
+        _client = InstrumentedRedis(connection_pool=pool)
+    return _client
+
+
+async def close_redis():
+    """Close the process-wide Redis client and disconnect its pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        await _client.connection_pool.disconnect()
+        _client = None
 
 
 class RedisService:
-    _redis: Redis = None
+    def __init__(self, redis: Redis = None, codec=None):
+        """
+        Cache operations on top of a Redis client.
+        Values are stored with plain SET/GET, so any Redis server works.
+        Attributes:
+            _redis (Redis): Client to use; defaults to the shared process client.
+            codec: Serializer for cached values; defaults to ``CACHE_CODEC``.
+        """
+        self._redis = redis
+        self.codec = codec or get_codec(CACHE_CODEC)
 
     async def redis(self):
         if self._redis is None:
-            self._redis = await from_url(
-                REDIS_URL,
-                password=REDIS_PASSWORD or None,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self._redis = init_redis()
         return self._redis
 
-    async def set_json(self, key: str, value: object, path: str = "$", expire: int = None):
+    async def set(self, key: str, value: object, expire: int = None):
+        """Encode a value with the configured codec and store it with SET."""
+        await self.set_raw(key, self.codec.encode(value), expire=expire)
+
+    async def get(self, key: str):
+        """Fetch and decode a single value; None on a miss."""
+        data = await self.get_raw(key)
+        if data is None:
+            return None
+        return self.codec.decode(data)
+
+    async def set_raw(self, key: str, data: bytes, expire: int = None):
+        """Store an already encoded payload."""
         redis = await self.redis()
-        if isinstance(value, list):
-            value = [json.dumps(item) for item in value]
-        else:
-            value = json.dumps(value)
-        await redis.execute_command("JSON.SET", key, path, value)
-        if expire is not None:
-            await redis.expire(key, expire)
+        await redis.set(key, data, ex=expire)
 
-    async def get_json(self, key: str, path: str = "$") -> dict:
+    async def get_raw(self, key: str) -> bytes:
+        """Fetch a payload without decoding it; None on a miss."""
         redis = await self.redis()
-        result = await redis.execute_command("JSON.GET", key, path)
-        if result is None:
-            return None
-        result = json.loads(result)
-        if isinstance(result[0], dict):
-            return result[0]
-        elif isinstance(result[0], list):
-            result = result[0]
-            return [json.loads(item) for item in result]
-
-    async def close(self):
-        if self.redis is not None:
-            self.redis.close()
-            await self.redis.wait_closed()
+        return await redis.get(key)
+
+    @staticmethod
+    def etag_key(key: str) -> str:
+        """Key holding the ETag of the payload stored at ``key``."""
+        return f"{key}:etag"
+
+    @staticmethod
+    def cursor_key(key: str) -> str:
+        """Key holding the next-page cursor of the list page stored at ``key``."""
+        return f"{key}:cursor"
+
+    async def set_raw_with_etag(
+        self, key: str, data: bytes, etag: str, expire: int = None, cursor: str = None
+    ):
+        """
+        Store an encoded payload and its ETag atomically, with the same TTL.
+        List pages pass their next cursor ("" on the last page) to store it too.
+        """
+        redis = await self.redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, data, ex=expire)
+            pipe.set(self.etag_key(key), etag, ex=expire)
+            if cursor is not None:
+                pipe.set(self.cursor_key(key), cursor, ex=expire)
+            await pipe.execute()
+
+    async def get_raw_page(self, key: str) -> tuple[bytes | None, str | None]:
+        """Fetch a list page payload and its stored next cursor with one MGET."""
+        redis = await self.redis()
+        data, cursor = await redis.mget([key, self.cursor_key(key)])
+        return data, cursor.decode() if cursor is not None else None
+
+    async def get_etag(self, key: str) -> str | None:
+        """Fetch the ETag stored next to ``key`` without reading the payload."""
+        redis = await self.redis()
+        etag = await redis.get(self.etag_key(key))
+        return etag.decode() if etag is not None else None
+
+    async def publish(self, channel: str, message: str):
+        redis = await self.redis()
+        await redis.publish(channel, message)
+
+    async def acquire_lock(self, key: str, ttl: float) -> str:
+        """
+        Try once to take a lock that expires on its own after ``ttl`` seconds.
+        Returns:
+            str: Token to release the lock with, or None if it is held elsewhere.
+        """
+        redis = await self.redis()
+        token = secrets.token_hex(16)
+        if await redis.set(key, token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str):
+        """Release a lock only if it is still held with ``token``."""
+        redis = await self.redis()
+        await redis.register_script(UNLOCK_SCRIPT)(keys=[key], args=[token])
+
+    async def extend_lock(self, key: str, token: str, ttl: float) -> bool:
+        """
+        Restart the expiry of a lock if it is still held with ``token``.
+        Returns:
+            bool: False if the lock expired and may be held elsewhere.
+        """
+        redis = await self.redis()
+        extended = await redis.register_script(EXTEND_LOCK_SCRIPT)(
+            keys=[key], args=[token, int(ttl * 1000)]
+        )
+        return bool(extended)
+
+    async def wait_for(self, key: str, timeout: float, interval: float = 0.02):
+        """Poll for a value to appear for up to ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(interval)
+            value = await self.get(key)
+            if value is not None:
+                return value
+        return None
 
     async def clear_cache(self):
         redis = await self.redis()
@@ -51,8 +214,29 @@ class RedisService:
         redis = await self.redis()
         await redis.delete(key)
 
-    async def clear_cache_by_pattern(self, pattern: str):
+    async def clear_cache_by_keys(self, keys: list[str]):
+        if not keys:
+            return
+        redis = await self.redis()
+        await redis.delete(*keys)
+
+    async def clear_cache_by_pattern(self, pattern: str, batch_size: int = 500):
+        """Delete matching keys with incremental SCAN; not meant for hot paths."""
         redis = await self.redis()
-        keys = await redis.keys(pattern)
+        keys = []
+        async for key in redis.scan_iter(match=pattern, count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                await redis.delete(*keys)
+                keys = []
         if keys:
             await redis.delete(*keys)
+
+    async def get_counter(self, key: str) -> int:
+        redis = await self.redis()
+        value = await redis.get(key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        redis = await self.redis()
+        return await redis.incr(key)
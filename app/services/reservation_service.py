@@ -1,48 +1,109 @@
-from fastapi import HTTPException
-from sqlalchemy import select
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.reservation import ReservationModel
-from app.models.product import ProductModel
-from app.schemas.reservations import ReservationCreate, ReservationUpdate
+from app.schemas.reservations import ReservationCreate, ReservationUpdate, Reservation
 from app.services.base_service import BaseService
+from app.services.redis_service import RedisService
+from app.services.inventory_service import get_inventory_service
 
 
 class ReservationService(BaseService):
-    async def get(self, skip: int = 0, limit: int = 10):
-        query = select(ReservationModel).offset(skip).limit(limit)
-        db_reservation = await self.db.execute(query)
-        return db_reservation.scalars().all()
+    model = ReservationModel
+    schema = Reservation
+    cache_ttl = 300
 
-    async def get_one(self, id: int):
-        return await self.get_entity_or_404(ReservationModel, id)
+    def __init__(self, db: AsyncSession, redis_service: RedisService = None):
+        super().__init__(db, redis_service)
+        self.inventory_service = get_inventory_service(db, self.redis_service)
 
     async def create(self, obj: ReservationCreate):
-        product = await self.db.get(ProductModel, obj.product_id)
-        if product.quantity < obj.quantity:
-            raise HTTPException(status_code=400, detail="Insufficient stock")
-        product.quantity -= obj.quantity
-        await product.update(self.db)
         db_reservation = ReservationModel(**obj.dict())
-        await db_reservation.save(self.db)
+        async with self.inventory_service.guard(), self.unit_of_work():
+            await self.inventory_service.reserve(obj.product_id, obj.quantity)
+            await db_reservation.save(self.db, commit=False)
+            await self.cache_entity(db_reservation)
+            await self.invalidate_list_cache()
+            await self.inventory_service.invalidate_cache()
         return db_reservation
 
     async def update(self, id: int, obj: ReservationUpdate):
-        db_reservation = await self.get_one(id)
-        product = await self.db.get(ProductModel, db_reservation.product_id)
-        if obj.quantity:
-            if product.quantity < obj.quantity:
-                raise HTTPException(status_code=400, detail="Insufficient stock")
-            if db_reservation.quantity < obj.quantity:
-                product.quantity -= obj.quantity - db_reservation.quantity
-            else:
-                product.quantity += db_reservation.quantity - obj.quantity
-            await product.update(self.db)
-        await db_reservation.update(self.db, **obj.dict(exclude_unset=True))
+        async with self.inventory_service.guard(), self.unit_of_work():
+            # Locked so concurrent updates, a cancellation or the sweeper
+            # can't adjust stock from the same stale quantity
+            db_reservation = await self.get_for_update(id)
+            if obj.quantity is not None:
+                quantity_diff = obj.quantity - db_reservation.quantity
+                if quantity_diff > 0:
+                    await self.inventory_service.reserve(
+                        db_reservation.product_id, quantity_diff
+                    )
+                elif quantity_diff < 0:
+                    await self.inventory_service.release(
+                        db_reservation.product_id, -quantity_diff
+                    )
+            await db_reservation.update(self.db, commit=False, **obj.dict(exclude_unset=True))
+            await self.cache_entity(db_reservation)
+            await self.invalidate_list_cache()
+            await self.inventory_service.invalidate_cache()
         return db_reservation
 
     async def delete(self, id: int):
-        db_reservation = await self.get_one(id)
-        product = await self.db.get(ProductModel, db_reservation.product_id)
-        product.quantity += db_reservation.quantity
-        await product.update(self.db)
-        await db_reservation.delete(self.db)
+        async with self.inventory_service.guard(), self.unit_of_work():
+            # Locked so only one of concurrent cancellations and the sweeper
+            # finds the reservation and returns its stock
+            db_reservation = await self.get_for_update(id)
+            await self.inventory_service.release(
+                db_reservation.product_id, db_reservation.quantity
+            )
+            await db_reservation.delete(self.db, commit=False)
+            await self.invalidate_entity_cache(id)
+            await self.invalidate_list_cache()
+            await self.inventory_service.invalidate_cache()
         return db_reservation
+
+    async def release_expired(self, limit: int) -> int:
+        """
+        Delete up to ``limit`` expired reservations and return their stock.
+
+        Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+        sweep at once without waiting on each other, and the freed stock is
+        returned with one aggregated UPDATE. Runs in its own transaction.
+        ``update()`` and ``delete()`` lock the row they change, so a
+        reservation being cancelled is skipped here, and one swept here is
+        gone by the time a cancellation gets its lock: the stock comes back
+        exactly once.
+        Args:
+            limit (int): Maximum number of reservations to release.
+        Returns:
+            int: Number of reservations released.
+        """
+        expired = (
+            select(ReservationModel.id)
+            .where(ReservationModel.expires_at <= datetime.utcnow())
+            .order_by(ReservationModel.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.inventory_service.guard(), self.unit_of_work():
+            result = await self.db.execute(
+                delete(ReservationModel)
+                .where(ReservationModel.id.in_(expired.scalar_subquery()))
+                .returning(
+                    ReservationModel.id,
+                    ReservationModel.product_id,
+                    ReservationModel.quantity,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            quantities: Dict[int, int] = {}
+            for _, product_id, quantity in rows:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            await self.inventory_service.release_many(quantities)
+            if rows:
+                await self.invalidate_entity_caches([id for id, _, _ in rows])
+                await self.invalidate_list_cache()
+                await self.inventory_service.invalidate_cache()
+        return len(rows)
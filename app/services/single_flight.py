@@ -0,0 +1,54 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the loader; callers arriving while it is
+    in flight wait for and share its result (or exception). If that caller is
+    cancelled, e.g. because its client went away, a waiter takes over the
+    call instead of failing with it. Nothing is kept once the call finishes,
+    so this is not a cache by itself.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable]):
+        """
+        Run ``loader`` once for all concurrent callers of ``key``.
+        Args:
+            key (str): Identity of the work, e.g. a cache key.
+            loader: Coroutine function producing the shared result.
+        Returns:
+            The loader's result.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This caller was cancelled, not the shared call
+                    raise
+            return await self.do(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await loader()
+        except Exception as ex:
+            future.set_exception(ex)
+            # Mark as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import CACHE_INVALIDATION_CHANNEL
+from app.database.replicas import replica_router
+from app.services.local_cache import local_cache
+from app.services.redis_service import RedisService
+
+# Key of the open unit of work in AsyncSession.info
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+
+class UnitOfWork:
+    def __init__(self, db: AsyncSession, redis_service: RedisService):
+        """
+        Cache changes collected while a session's transaction is open.
+
+        Every service sharing the session queues into the same unit of work,
+        so a key written or dropped several times is sent once, and the whole
+        batch goes to Redis in one MULTI/EXEC pipeline after the commit.
+        Attributes:
+            db (AsyncSession): Session the changes belong to.
+            redis_service (RedisService): Redis service used to flush.
+            writes (Dict[str, tuple]): Encoded payload, ETag and TTL per key.
+            deletes (set[str]): Keys to delete together with their ETags.
+            generations (set[str]): List generation counters to bump.
+            evictions (set[str]): Keys to drop from every worker's L1 cache.
+        """
+        self.db = db
+        self.redis_service = redis_service
+        self.writes: Dict[str, Tuple[bytes, str, Optional[int]]] = {}
+        self.deletes: set[str] = set()
+        self.generations: set[str] = set()
+        self.evictions: set[str] = set()
+
+    @staticmethod
+    def current(db: AsyncSession) -> Optional["UnitOfWork"]:
+        """The unit of work open on a session, if any."""
+        return db.info.get(UNIT_OF_WORK_KEY) if db is not None else None
+
+    def set(self, key: str, data: bytes, etag: str, expire: int = None, evict: bool = False):
+        """Write an encoded payload and its ETag; replaces a pending delete."""
+        self.deletes.discard(key)
+        self.writes[key] = (data, etag, expire)
+        if evict:
+            self.evictions.add(key)
+
+    def delete(self, keys: Iterable[str], evict: bool = False):
+        """Delete keys and their ETags; replaces pending writes."""
+        for key in keys:
+            self.writes.pop(key, None)
+            self.deletes.add(key)
+            if evict:
+                self.evictions.add(key)
+
+    def bump(self, generation_key: str):
+        """Increment a list generation counter once, however often requested."""
+        self.generations.add(generation_key)
+
+    def discard(self):
+        self.writes.clear()
+        self.deletes.clear()
+        self.generations.clear()
+        self.evictions.clear()
+
+    async def flush(self, repeat: bool = True):
+        """
+        Send the queued changes in one pipeline and forget them.
+        Args:
+            repeat (bool): If True, deletes, counter bumps and L1 evictions are
+                sent again once replicas have caught up, so a lagging replica
+                can't refill the cache with the old rows.
+        """
+        writes, deletes = self.writes, sorted(self.deletes)
+        generations, evictions = sorted(self.generations), sorted(self.evictions)
+        self.writes, self.deletes, self.generations, self.evictions = {}, set(), set(), set()
+        if not (writes or deletes or generations or evictions):
+            return
+
+        redis = await self.redis_service.redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            if deletes:
+                pipe.delete(*deletes, *[self.redis_service.etag_key(key) for key in deletes])
+            for key in generations:
+                pipe.incr(key)
+            for key, (data, etag, expire) in writes.items():
+                pipe.set(key, data, ex=expire)
+                pipe.set(self.redis_service.etag_key(key), etag, ex=expire)
+            if evictions:
+                pipe.publish(CACHE_INVALIDATION_CHANNEL, "\n".join(evictions))
+            await pipe.execute()
+        if evictions:
+            local_cache.delete(*evictions)
+
+        if repeat and (deletes or generations or evictions):
+            again = UnitOfWork(self.db, self.redis_service)
+            again.delete(deletes)
+            again.generations.update(generations)
+            again.evictions.update(evictions)
+            replica_router.repeat_later(lambda: again.flush(repeat=False))
@@ -1,8 +1,8 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from app.utils import hash_password, verify_password
+from app.services.password_hasher import password_hasher
 from app.models.user import UserModel
-from app.schemas.users import UserCreate, UserUpdate, User
+from app.schemas.users import UserCreate, UserUpdate, User, UserPrincipal
 from sqlalchemy.sql.expression import select
 from app.services.base_service import BaseService
 from app.utils import create_access_token
@@ -11,30 +11,29 @@ from sqlalchemy.sql import or_
 
 
 class UserService(BaseService):
-    async def get(self, skip: int = 0, limit: int = 10):
-        query = select(UserModel).offset(skip).limit(limit)
-        users = await self.db.execute(query)
-        return users.scalars().all()
-
-    async def get_one(self, id: int):
-        return await self.get_entity_or_404(UserModel, id)
+    model = UserModel
+    # Cached users never include the password hash; the token version lets
+    # get_current_user reject revoked tokens without another query
+    schema = UserPrincipal
+    cache_ttl = 60
+    use_local_cache = True
 
     async def create(self, obj: UserCreate):
-        db_user = UserModel(**obj.dict())
-        db_user.password = hash_password(db_user.password)
-        await db_user.save(self.db)
-        return db_user
+        obj.password = await password_hasher.hash(obj.password)
+        return await super().create(obj)
 
     async def update(self, id: int, obj: UserUpdate):
-        db_user = await self.get_one(id)
+        """Update a user; a new password revokes every token issued before."""
+        changes = obj.model_dump(exclude_unset=True)
         if obj.password:
-            obj.password = hash_password(obj.password)
-        await db_user.update(self.db, **obj.dict(exclude_unset=True))
-        return db_user
-
-    async def delete(self, id: int):
-        user = await self.get_one(id)
-        await user.delete(self.db)
+            changes["password"] = await password_hasher.hash(obj.password)
+        async with self.unit_of_work():
+            user = await self.get_one(id, use_cache=False)
+            if obj.password:
+                changes["token_version"] = user.token_version + 1
+            await user.update(self.db, commit=False, **changes)
+            await self.cache_entity(user)
+            await self.invalidate_list_cache()
         return user
 
     async def authenticate_user(self, identifier: str, password: str):
@@ -52,12 +51,20 @@ class UserService(BaseService):
         result = await self.db.execute(query)
         user = result.scalar_one_or_none()
 
-        if not user or not verify_password(password, user.password):
+        verified, new_hash = False, None
+        if user:
+            verified, new_hash = await password_hasher.verify_and_update(
+                password, user.password
+            )
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username/email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if new_hash:
+            # Stored with an older cost factor; upgrade while we have the plain text
+            await user.update(self.db, password=new_hash)
         return user
 
     async def login(self, identifier: str, password: str):
@@ -65,5 +72,7 @@ class UserService(BaseService):
         Authenticate and return a JWT token.
         """
         user = await self.authenticate_user(identifier, password)
-        access_token = create_access_token(data={"sub": str(user.id)})
+        access_token = create_access_token(
+            data={"sub": str(user.id), "ver": user.token_version}
+        )
         return {"access_token": access_token, "token_type": "bearer"}
@@ -1,14 +1,23 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+import base64
+import binascii
+import hashlib
+import json
 
 import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import HTTPException, status
+from fastapi import HTTPException, Request, Response, status
 
-from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, BCRYPT_ROUNDS
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -19,6 +28,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify a password and return a replacement hash if the stored one is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """Create a new JWT access token."""
     to_encode = data.copy()
@@ -41,3 +57,98 @@ def decode_access_token(token: str):
         return payload
     except InvalidTokenError:
         raise credentials_exception
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen entity ID into an opaque pagination cursor."""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a pagination cursor back into the last seen entity ID."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+        )
+
+
+def next_cursor(items: list, limit: int) -> str | None:
+    """Cursor of the page following ``items``, or None if it was the last one."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+
+
+def set_next_cursor(response: Response, items: list, limit: int):
+    """Expose the cursor of the following page in the X-Next-Cursor header."""
+    cursor = next_cursor(items, limit)
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = cursor
+
+
+class CachedPage(bytes):
+    """JSON bytes of a cached list page, with the cursor stored next to them."""
+
+    next_cursor: str | None = None
+
+
+def cached_json_response(data: bytes, max_age: int | None = None) -> Response:
+    """
+    Serve cached JSON bytes as the response body, skipping response_model
+    validation and re-serialization. A ``CachedPage`` also gets its
+    X-Next-Cursor header; pass ``max_age`` to add caching headers.
+    """
+    response = Response(content=data, media_type="application/json")
+    cursor = getattr(data, "next_cursor", None)
+    if cursor is not None:
+        response.headers["X-Next-Cursor"] = cursor
+    if max_age is not None:
+        set_cache_headers(response, make_etag(data), max_age)
+    return response
+
+
+def make_etag(data: bytes) -> str:
+    """Strong ETag from the hash of a response body."""
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str | None) -> bool:
+    """Whether the request's If-None-Match header already names ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+async def check_not_modified(request: Request, load_etag, max_age: int) -> Response | None:
+    """
+    Answer a conditional GET with 304 if the client's copy is current.
+    Args:
+        request (Request): Incoming request.
+        load_etag: Coroutine function returning the stored ETag, or None.
+            Only called when the request carries If-None-Match.
+        max_age (int): Cache-Control max-age in seconds.
+    Returns:
+        Response | None: A 304 response, or None to serve the body.
+    """
+    if not request.headers.get("if-none-match"):
+        return None
+    etag = await load_etag()
+    if not etag_matches(request, etag):
+        return None
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag, max_age)
+    return response
+
+
+def set_cache_headers(response: Response, etag: str, max_age: int):
+    """Add an ETag and a Cache-Control max-age to a response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
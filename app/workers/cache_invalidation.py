@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from app.config import CACHE_INVALIDATION_CHANNEL
+from app.services.local_cache import local_cache
+from app.services.redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidationListener:
+    def __init__(self, channel: str = CACHE_INVALIDATION_CHANNEL):
+        """
+        Evicts L1 cache entries when any worker publishes an invalidation.
+        Attributes:
+            channel (str): Redis pub/sub channel carrying newline-separated keys.
+            redis_service (RedisService): Redis service instance.
+        """
+        self.channel = channel
+        self.redis_service = RedisService()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener lost its connection")
+                await asyncio.sleep(1)
+            # Messages may have been missed while disconnected
+            local_cache.clear()
+
+    async def _listen(self):
+        redis = await self.redis_service.redis()
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                data = message["data"]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                local_cache.delete(*data.split("\n"))
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
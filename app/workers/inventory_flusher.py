@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Dict
+from sqlalchemy import delete, update, values, column, Integer
+from sqlalchemy.dialects.postgresql import insert
+from app.config import INVENTORY_FLUSH_INTERVAL
+from app.database.database import async_session
+from app.models.inventory_flush_batch import InventoryFlushBatchModel
+from app.models.product import ProductModel
+from app.services.inventory_counters import InventoryCounters
+from app.services.product_service import ProductService
+from app.services.redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 1000
+
+
+class InventoryFlusher:
+    def __init__(self, interval: float = INVENTORY_FLUSH_INTERVAL):
+        """
+        Write-behind of Redis inventory counters to ``products.quantity``.
+        Attributes:
+            interval (float): Seconds between flushes.
+            counters (InventoryCounters): Redis counters being flushed.
+        """
+        self.interval = interval
+        self.counters = InventoryCounters(RedisService())
+        self._task: asyncio.Task | None = None
+
+    async def reconcile(self):
+        """
+        Bring Redis and Postgres back in line on startup.
+        Deltas left by a previous process are flushed first, then all
+        counters are dropped so they are seeded again from Postgres. That also
+        picks up quantities changed directly in the database while down.
+        """
+        async with self.counters.lock() as token:
+            await self._flush_locked(token)
+            await self.counters.forget_all()
+
+    async def flush(self) -> int:
+        """
+        Apply all pending deltas in batched UPDATEs within one transaction.
+
+        The deltas taken from Redis carry a batch ID that is recorded in
+        ``inventory_flush_batches`` in the same transaction. A batch that is
+        handed out again, because clearing it from Redis failed or the
+        process died after the commit, is then recognised and not applied a
+        second time. The lock is checked and extended right before the
+        commit, so a flusher whose lock expired rolls back instead.
+        Returns:
+            int: Number of products written.
+        """
+        async with self.counters.lock() as token:
+            return await self._flush_locked(token)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and flush whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Inventory flush failed; deltas kept for the next run")
+
+    async def _flush_locked(self, token: str) -> int:
+        batch_id, pending = await self.counters.take_pending()
+        if batch_id is None:
+            return 0
+        if not pending:
+            await self.counters.finish_flush(batch_id)
+            return 0
+        async with async_session() as session:
+            async with session.begin():
+                applied = await self._apply_batch(session, batch_id, pending)
+                await self.counters.renew_lock(token)
+            await self.counters.finish_flush(batch_id)
+            if not applied:
+                logger.info(f"Inventory batch {batch_id} was already flushed")
+                return 0
+            product_service = ProductService(session, self.counters.redis_service)
+            async with product_service.unit_of_work():
+                await product_service.invalidate_entity_caches(pending.keys())
+                await product_service.invalidate_list_cache()
+        logger.info(f"Flushed inventory deltas for {len(pending)} products")
+        return len(pending)
+
+    async def _apply_batch(self, session, batch_id: str, pending: Dict[int, int]) -> bool:
+        """Record the batch and apply its deltas, unless it was recorded before."""
+        recorded = await session.scalar(
+            insert(InventoryFlushBatchModel)
+            .values(id=batch_id)
+            .on_conflict_do_nothing()
+            .returning(InventoryFlushBatchModel.id)
+        )
+        if recorded is None:
+            return False
+        # Only the batch being flushed can be handed out again
+        await session.execute(
+            delete(InventoryFlushBatchModel).where(InventoryFlushBatchModel.id != batch_id)
+        )
+        items = sorted(pending.items())
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            await session.execute(self._apply_query(items[start:start + FLUSH_BATCH_SIZE]))
+        return True
+
+    @staticmethod
+    def _apply_query(items: list[tuple[int, int]]):
+        deltas = values(
+            column("id", Integer), column("delta", Integer), name="deltas"
+        ).data(items)
+        return (
+            update(ProductModel)
+            .where(ProductModel.id == deltas.c.id)
+            .values(quantity=ProductModel.quantity + deltas.c.delta)
+            .execution_options(synchronize_session=False)
+        )
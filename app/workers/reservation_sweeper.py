@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from app.config import RESERVATION_SWEEP_INTERVAL, RESERVATION_SWEEP_BATCH_SIZE
+from app.database.database import async_session
+from app.services.redis_service import RedisService
+from app.services.reservation_service import ReservationService
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationSweeper:
+    def __init__(
+        self,
+        interval: float = RESERVATION_SWEEP_INTERVAL,
+        batch_size: int = RESERVATION_SWEEP_BATCH_SIZE,
+    ):
+        """
+        Releases expired reservations in the background.
+        Attributes:
+            interval (float): Seconds between sweeps.
+            batch_size (int): Reservations released per transaction.
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self.redis_service = RedisService()
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        """
+        Release expired reservations batch by batch until none are left.
+        Returns:
+            int: Number of reservations released.
+        """
+        total = 0
+        while True:
+            async with async_session() as session:
+                service = ReservationService(session, self.redis_service)
+                released = await service.release_expired(self.batch_size)
+            total += released
+            if released < self.batch_size:
+                break
+        if total:
+            logger.info(f"Released {total} expired reservations")
+        return total
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Reservation sweep failed; retrying on the next run")
+            await asyncio.sleep(self.interval)
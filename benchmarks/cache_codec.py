@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of cache serialization.
+
+Compares the legacy RedisJSON encoding (each list element JSON-encoded into
+a string, the array encoded again for JSON.SET, and the pydantic
+``model_dump_json()`` string encoded on top) against the single-pass codecs
+in ``app.services.cache_codec``. Only encoding and decoding are measured, so
+no Redis server is needed.
+
+    python -m benchmarks.cache_codec [--items 10] [--number 2000]
+"""
+import argparse
+import json
+import timeit
+
+from app.services.cache_codec import CODECS
+
+
+def make_products(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "name": f"Product {i}",
+            "description": "A reasonably long product description " * 4,
+            "price": 19.99 + i,
+            "quantity": 100 + i,
+            "category_id": i % 20,
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_roundtrip(products: list[dict]) -> list[dict]:
+    """What ProductService.get + RedisService.set_json/get_json used to do."""
+    cached = [json.dumps(product) for product in products]  # model_dump_json()
+    stored = json.dumps([json.dumps(item) for item in cached])  # set_json
+    loaded = json.loads(stored)  # JSON.GET + get_json
+    return [json.loads(json.loads(item)) for item in loaded]
+
+
+def codec_roundtrip(codec, products: list[dict]) -> list[dict]:
+    return codec.decode(codec.encode(products))
+
+
+def run(items: int, number: int) -> dict[str, float]:
+    products = make_products(items)
+    results = {"legacy (RedisJSON)": timeit.timeit(lambda: legacy_roundtrip(products), number=number)}
+    for name, codec_class in CODECS.items():
+        codec = codec_class()
+        results[name] = timeit.timeit(lambda: codec_roundtrip(codec, products), number=number)
+    return {name: total / number * 1e6 for name, total in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    for items in args.items:
+        results = run(items, args.number)
+        baseline = results["legacy (RedisJSON)"]
+        print(f"\n{items} item(s), encode + decode, {args.number} runs")
+        for name, micros in results.items():
+            print(f"  {name:<20} {micros:10.2f} us  {baseline / micros:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
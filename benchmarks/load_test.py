@@ -0,0 +1,324 @@
+"""
+Load test of the whole API, running in-process.
+
+The app is driven through httpx's ASGI transport (no network or uvicorn in
+the way) against a local Postgres and Redis, e.g. the docker-compose ones:
+
+    docker compose up -d db redis
+    python -m benchmarks.load_test --output baseline.json
+    python -m benchmarks.load_test --baseline baseline.json
+
+A dedicated database (BENCH_DB, default ``shop_bench``) is created if
+needed, migrated, and reseeded deterministically from ``--seed`` on every
+run; a dedicated Redis index (BENCH_REDIS_DB, default 15) is flushed. Both
+override DEFAULT_DB and REDIS_DB, so a run never resets the working data.
+Each workload then runs for ``--duration`` seconds with ``--concurrency``
+virtual users, and throughput plus p50/p95/p99 latency are reported per
+endpoint. With ``--baseline`` the run is compared against a saved one and
+the exit status is 1 if any endpoint regressed by more than ``--tolerance``.
+
+Workloads:
+    browse       product/category pages, product details and search
+    checkout     POST /api/orders/ with one to three products
+    reservation  create and cancel reservations
+    login        POST /auth/token bursts (bcrypt bound)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+# Point the app at the local stand-ins before any app module reads its config
+BENCH_ENV = {
+    "DEFAULT_HOST": "localhost",
+    "REDIS_HOST": "localhost",
+    "SECRET_KEY": "benchmark-secret",
+    "RESERVATION_SWEEPER_ENABLED": "false",
+}
+for _name, _value in BENCH_ENV.items():
+    os.environ.setdefault(_name, _value)
+# Seeding truncates every table and flushes Redis, so the database and the
+# Redis index are always the dedicated ones, whatever the shell or .env says
+BENCH_DB = os.getenv("BENCH_DB", "shop_bench")
+BENCH_REDIS_DB = os.getenv("BENCH_REDIS_DB", "15")
+os.environ["DEFAULT_DB"] = BENCH_DB
+os.environ["REDIS_DB"] = BENCH_REDIS_DB
+
+PASSWORD = "benchmark-password"
+SEARCH_TERMS = ["red", "steel", "organic", "wireless", "cotton", "pro", "mini", "eco"]
+WORDS = SEARCH_TERMS + ["classic", "smart", "light", "heavy", "blue", "green", "max"]
+WORKLOADS = ("browse", "checkout", "reservation", "login")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        results = {}
+        for name, samples in sorted(self.latencies.items()):
+            samples.sort()
+            results[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "throughput": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+            }
+        return results
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def zipf_weights(count: int, skew: float = 1.1) -> list[float]:
+    """A few products get most of the traffic, like a real catalog."""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+class Scenario:
+    def __init__(self, args, rng: random.Random, recorder: Recorder):
+        self.args = args
+        self.rng = rng
+        self.recorder = recorder
+        self.product_ids = list(range(1, args.products + 1))
+        self.weights = zipf_weights(args.products)
+
+    def product(self) -> int:
+        return self.rng.choices(self.product_ids, self.weights)[0]
+
+    async def browse(self, client):
+        call, rng = self.recorder.call, self.rng
+        page = rng.randrange(0, 20)
+        await call(client, "GET /api/products/", "GET", f"/api/products/?skip={page * 10}&limit=10")
+        await call(client, "GET /api/products/{id}", "GET", f"/api/products/{self.product()}")
+        await call(client, "GET /api/categories/", "GET", "/api/categories/?limit=20")
+        if rng.random() < 0.3:
+            await call(
+                client, "GET /api/products/search", "GET",
+                "/api/products/search", params={"q": rng.choice(SEARCH_TERMS), "in_stock": "true"},
+            )
+
+    async def checkout(self, client):
+        items = [
+            {"product_id": self.product(), "quantity": 1}
+            for _ in range(self.rng.randint(1, 3))
+        ]
+        await self.recorder.call(
+            client, "POST /api/orders/", "POST", "/api/orders/",
+            json={"user_id": self.rng.randint(1, self.args.users), "items": items},
+        )
+
+    async def reservation(self, client):
+        response = await self.recorder.call(
+            client, "POST /api/reservations/", "POST", "/api/reservations/",
+            json={
+                "user_id": self.rng.randint(1, self.args.users),
+                "product_id": self.product(),
+                "quantity": 1,
+            },
+        )
+        if response.status_code < 400:
+            await self.recorder.call(
+                client, "DELETE /api/reservations/{id}", "DELETE",
+                f"/api/reservations/{response.json()['id']}",
+            )
+
+    async def login(self, client):
+        user = self.rng.randint(1, self.args.users)
+        await self.recorder.call(
+            client, "POST /auth/token", "POST", "/auth/token",
+            data={"username": f"user{user}", "password": PASSWORD},
+        )
+
+
+def prepare_database():
+    """Create and migrate the benchmark database; runs outside the event loop."""
+    import asyncpg
+    from alembic import command
+    from alembic.config import Config
+    from app.config import DEFAULT_USER, DEFAULT_PASSWORD, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_DB
+
+    async def create():
+        conn = await asyncpg.connect(
+            user=DEFAULT_USER, password=DEFAULT_PASSWORD, host=DEFAULT_HOST,
+            port=int(DEFAULT_PORT), database="postgres",
+        )
+        try:
+            exists = await conn.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", DEFAULT_DB)
+            if not exists:
+                await conn.execute(f'CREATE DATABASE "{DEFAULT_DB}"')
+        finally:
+            await conn.close()
+
+    asyncio.run(create())
+    command.upgrade(Config("alembic.ini"), "head")
+
+
+def check_targets():
+    """Refuse to wipe anything but the benchmark database and Redis index."""
+    from app.config import DEFAULT_DB, REDIS_DB
+
+    if DEFAULT_DB != BENCH_DB or str(REDIS_DB) != BENCH_REDIS_DB:
+        sys.exit(
+            f"refusing to reset database {DEFAULT_DB!r} / Redis DB {REDIS_DB}: "
+            f"expected {BENCH_DB!r} / {BENCH_REDIS_DB}"
+        )
+
+
+async def seed(args):
+    """Reset every table and load a deterministic catalog."""
+    from sqlalchemy import insert, text
+    from app.database.database import engine
+
+    check_targets()
+    from app.models import CategoryModel, ProductModel, UserModel
+    from app.services.redis_service import RedisService
+    from app.utils import hash_password
+
+    rng = random.Random(args.seed)
+    password = hash_password(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "TRUNCATE order_items, orders, reservations, products, categories, users "
+            "RESTART IDENTITY CASCADE"
+        ))
+        await conn.execute(
+            insert(CategoryModel), [{"name": f"Category {i}"} for i in range(1, 21)]
+        )
+        await conn.execute(insert(UserModel), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password": password}
+            for i in range(1, args.users + 1)
+        ])
+        await conn.execute(insert(ProductModel), [
+            {
+                "name": " ".join(rng.sample(WORDS, 3)).title(),
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "price": round(rng.uniform(1, 500), 2),
+                # Deep stock so checkouts never fail for lack of it
+                "quantity": 1_000_000,
+                "category_id": rng.randint(1, 20),
+            }
+            for _ in range(args.products)
+        ])
+    redis = await RedisService().redis()
+    await redis.flushdb()
+
+
+async def run_workload(app, name: str, args) -> dict:
+    import httpx
+
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+
+    async def user(index: int):
+        scenario = Scenario(args, random.Random(f"{args.seed}-{name}-{index}"), recorder)
+        step = getattr(scenario, name)
+        while time.perf_counter() < deadline:
+            await step(client)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed)
+
+
+async def run(args) -> dict:
+    from app.main import app
+
+    await seed(args)
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in args.workloads:
+            print(f"running {name} for {args.duration}s with {args.concurrency} users")
+            for endpoint, stats in (await run_workload(app, name, args)).items():
+                results[f"{name}: {endpoint}"] = stats
+    return results
+
+
+def print_results(results: dict):
+    print(f"\n{'endpoint':<52} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, stats in results.items():
+        print(
+            f"{name:<52} {stats['throughput']:9.1f} {stats['p50_ms']:8.2f}"
+            f" {stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f} {stats['errors']:7d}"
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change against a baseline; True if nothing regressed."""
+    ok = True
+    print(f"\n{'endpoint':<52} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        changes = {
+            "throughput": stats["throughput"] / before["throughput"] - 1 if before["throughput"] else 0,
+            **{
+                key: stats[key] / before[key] - 1 if before[key] else 0
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            },
+        }
+        # Lower throughput or higher latency beyond the tolerance is a regression
+        regressed = changes["throughput"] < -tolerance or any(
+            changes[key] > tolerance for key in ("p50_ms", "p95_ms", "p99_ms")
+        )
+        ok = ok and not regressed
+        print(
+            f"{name:<52} {changes['throughput']:+8.1%} {changes['p50_ms']:+8.1%}"
+            f" {changes['p95_ms']:+8.1%} {changes['p99_ms']:+8.1%}"
+            + ("  REGRESSED" if regressed else "")
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare against saved JSON results")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    prepare_database()
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"args": vars(args), "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Shared fixtures.
+
+Redis is replaced by fakeredis. Tests that need Postgres take the ``db``
+fixture and are skipped when TEST_DB (``shop_test``) on DEFAULT_HOST
+(localhost, e.g. the docker-compose service) can't be reached; the tables
+are created on first use and emptied before every test. TEST_DB always
+overrides DEFAULT_DB, so the tests never truncate a working database.
+"""
+import os
+
+# Point the app at the test stand-ins before any app module reads its config
+TEST_ENV = {
+    "DEFAULT_HOST": "localhost",
+    "REDIS_HOST": "localhost",
+    "SECRET_KEY": "test-secret",
+    "BCRYPT_ROUNDS": "4",
+    "RESERVATION_SWEEPER_ENABLED": "false",
+}
+for _name, _value in TEST_ENV.items():
+    os.environ.setdefault(_name, _value)
+# Every test empties the tables, so only ever the dedicated database
+TEST_DB = os.getenv("TEST_DB", "shop_test")
+os.environ["DEFAULT_DB"] = TEST_DB
+
+import fakeredis.aioredis
+import httpx
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+
+from app.config import DEFAULT_DB
+from app.database.base_model import Base
+from app.database.database import async_session, engine
+from app.main import app
+from app.models import CategoryModel, ProductModel, UserModel
+from app.services import redis_service
+from app.services.local_cache import local_cache
+
+TABLES = "order_items, orders, reservations, products, categories, users"
+
+# Stock every seeded product starts with
+STOCK = 10
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis(monkeypatch):
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(redis_service, "_client", client)
+    local_cache.clear()
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def db(redis):
+    """Session factory on empty tables."""
+    if DEFAULT_DB != TEST_DB:
+        pytest.exit(f"refusing to truncate {DEFAULT_DB!r}: tests only run on {TEST_DB!r}")
+    try:
+        conn = await engine.connect()
+    except (OSError, DBAPIError) as ex:
+        pytest.skip(f"Postgres is not available: {ex}")
+    try:
+        async with conn.begin():
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text(f"TRUNCATE {TABLES} RESTART IDENTITY CASCADE"))
+    finally:
+        await conn.close()
+    yield async_session
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
+@pytest.fixture
+async def products(db):
+    """One user and three products with ``STOCK`` units each; returns the product IDs."""
+    async with db() as session, session.begin():
+        await session.execute(insert(CategoryModel).values(id=1, name="Category"))
+        await session.execute(insert(UserModel).values(
+            id=1, username="user", email="user@example.com", password="x",
+        ))
+        await session.execute(insert(ProductModel), [
+            {"id": id, "name": f"Product {id}", "description": "", "price": 5.0,
+             "quantity": STOCK, "category_id": 1}
+            for id in (1, 2, 3)
+        ])
+    return [1, 2, 3]
+
+
+@pytest.fixture
+async def client(redis):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
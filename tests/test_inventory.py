@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.models import OrderItemModel, ProductModel
+from app.services.inventory_counters import InventoryCounters
+from app.services.inventory_service import InventoryService
+from app.services.redis_service import RedisService
+from tests.conftest import STOCK
+
+pytestmark = pytest.mark.anyio
+
+
+async def stock(db, product_id: int) -> int:
+    async with db() as session:
+        return await session.scalar(
+            select(ProductModel.quantity).where(ProductModel.id == product_id)
+        )
+
+
+async def test_concurrent_order_deletes_release_stock_once(db, products, client):
+    response = await client.post(
+        "/api/orders/", json={"user_id": 1, "items": [{"product_id": 1, "quantity": 4}]}
+    )
+    order_id = response.json()["id"]
+
+    first, second = await asyncio.gather(
+        client.delete(f"/api/orders/{order_id}"), client.delete(f"/api/orders/{order_id}")
+    )
+
+    assert sorted([first.status_code, second.status_code]) == [200, 404]
+    assert await stock(db, 1) == STOCK
+
+
+async def test_concurrent_reservation_writes_keep_stock(db, products, client):
+    response = await client.post(
+        "/api/reservations/", json={"user_id": 1, "product_id": 1, "quantity": 2}
+    )
+    reservation_id = response.json()["id"]
+
+    await asyncio.gather(
+        client.put(f"/api/reservations/{reservation_id}", json={"quantity": 5}),
+        client.put(f"/api/reservations/{reservation_id}", json={"quantity": 7}),
+    )
+    reserved = (await client.get(f"/api/reservations/{reservation_id}")).json()["quantity"]
+    assert await stock(db, 1) == STOCK - reserved
+
+    responses = await asyncio.gather(
+        client.delete(f"/api/reservations/{reservation_id}"),
+        client.delete(f"/api/reservations/{reservation_id}"),
+    )
+    assert sorted(response.status_code for response in responses) == [200, 404]
+    assert await stock(db, 1) == STOCK
+
+
+@pytest.mark.parametrize("quantity", [0, -100])
+async def test_non_positive_quantities_are_rejected(client, quantity):
+    order = await client.post(
+        "/api/orders/", json={"user_id": 1, "items": [{"product_id": 1, "quantity": quantity}]}
+    )
+    reservation = await client.post(
+        "/api/reservations/", json={"user_id": 1, "product_id": 1, "quantity": quantity}
+    )
+    update = await client.put("/api/reservations/1", json={"quantity": quantity})
+
+    assert order.status_code == reservation.status_code == update.status_code == 422
+
+
+async def test_database_inventory_rejects_negative_amounts(db, products):
+    async with db() as session:
+        inventory = InventoryService(session)
+        with pytest.raises(ValueError):
+            await inventory.reserve_many({1: -100})
+        with pytest.raises(ValueError):
+            await inventory.release_many({1: 0})
+    assert await stock(db, 1) == STOCK
+
+
+async def test_counters_reject_negative_amounts(redis):
+    counters = InventoryCounters(RedisService())
+    await redis.set(counters.counter_key(1), STOCK)
+    await redis.set(counters.counter_key(2), STOCK)
+
+    with pytest.raises(ValueError):
+        await counters.reserve({1: 1, 2: -100})
+
+    assert int(await redis.get(counters.counter_key(1))) == STOCK
+    assert int(await redis.get(counters.counter_key(2))) == STOCK
+
+
+async def test_order_lines_are_merged(db, products, client):
+    response = await client.post("/api/orders/", json={"user_id": 1, "items": [
+        {"product_id": 1, "quantity": 2}, {"product_id": 1, "quantity": 3},
+    ]})
+
+    items = response.json()["items"]
+    assert [(item["product_id"], item["quantity"]) for item in items] == [(1, 5)]
+    assert await stock(db, 1) == STOCK - 5
+
+
+async def test_order_update_collapses_duplicate_lines(db, products, client):
+    response = await client.post(
+        "/api/orders/", json={"user_id": 1, "items": [{"product_id": 1, "quantity": 2}]}
+    )
+    order_id = response.json()["id"]
+    # A second line for the same product, as stored before lines were merged
+    async with db() as session, session.begin():
+        await session.execute(insert(OrderItemModel).values(
+            order_id=order_id, product_id=1, quantity=3, price_at_order_time=5.0
+        ))
+        await session.execute(
+            ProductModel.__table__.update().where(ProductModel.id == 1)
+            .values(quantity=ProductModel.quantity - 3)
+        )
+
+    response = await client.put(f"/api/orders/{order_id}", json={"items": [
+        {"product_id": 1, "quantity": 4}, {"product_id": 2, "quantity": 1},
+    ]})
+
+    items = sorted((item["product_id"], item["quantity"]) for item in response.json()["items"])
+    assert items == [(1, 4), (2, 1)]
+    assert await stock(db, 1) == STOCK - 4
+    assert await stock(db, 2) == STOCK - 1
+
+    await client.delete(f"/api/orders/{order_id}")
+    assert await stock(db, 1) == STOCK
+    assert await stock(db, 2) == STOCK
+
+
+async def test_empty_order_is_accepted(db, products, client):
+    response = await client.post("/api/orders/", json={"user_id": 1, "items": []})
+
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    order = await client.get(f"/api/orders/{response.json()['id']}")
+    assert order.json()["items"] == []
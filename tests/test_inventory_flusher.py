@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import select
+
+from app.models import ProductModel
+from app.services.inventory_counters import LOCK_KEY, LockLost
+from app.services.inventory_service import RedisInventoryService
+from app.workers.inventory_flusher import InventoryFlusher
+from tests.conftest import STOCK
+
+pytestmark = pytest.mark.anyio
+
+
+async def stock(db, product_id: int) -> int:
+    async with db() as session:
+        return await session.scalar(
+            select(ProductModel.quantity).where(ProductModel.id == product_id)
+        )
+
+
+def fail_once(monkeypatch, target, name: str, error: Exception, before=None):
+    """Make ``target.name`` raise ``error`` on its next call, after running it if ``before``."""
+    original = getattr(target, name)
+
+    async def failing(*args, **kwargs):
+        monkeypatch.setattr(target, name, original)
+        if before:
+            await original(*args, **kwargs)
+        raise error
+
+    monkeypatch.setattr(target, name, failing)
+
+
+async def test_batch_is_not_applied_twice(db, products, monkeypatch):
+    flusher = InventoryFlusher()
+    await flusher.counters.release({1: 3, 2: 1})
+    # Postgres commits, but the batch stays in Redis
+    fail_once(monkeypatch, flusher.counters, "finish_flush", ConnectionError())
+    with pytest.raises(ConnectionError):
+        await flusher.flush()
+    assert await stock(db, 1) == STOCK + 3
+
+    assert await flusher.flush() == 0
+    assert await stock(db, 1) == STOCK + 3
+    assert await stock(db, 2) == STOCK + 1
+
+    await flusher.counters.release({1: 2})
+    assert await flusher.flush() == 1
+    assert await stock(db, 1) == STOCK + 5
+
+
+async def test_flush_rolls_back_when_lock_expired(db, products, redis, monkeypatch):
+    flusher = InventoryFlusher()
+    await flusher.counters.release({1: 3})
+    apply_batch = flusher._apply_batch
+
+    async def apply_then_expire(*args):
+        applied = await apply_batch(*args)
+        await redis.delete(LOCK_KEY)
+        return applied
+
+    monkeypatch.setattr(flusher, "_apply_batch", apply_then_expire)
+    with pytest.raises(LockLost):
+        await flusher.flush()
+    assert await stock(db, 1) == STOCK
+
+    monkeypatch.setattr(flusher, "_apply_batch", apply_batch)
+    assert await flusher.flush() == 1
+    assert await stock(db, 1) == STOCK + 3
+
+
+async def test_seeding_skips_applied_batch(db, products, monkeypatch):
+    flusher = InventoryFlusher()
+    await flusher.counters.release({1: 3})
+    fail_once(monkeypatch, flusher.counters, "finish_flush", ConnectionError())
+    with pytest.raises(ConnectionError):
+        await flusher.flush()
+
+    async with db() as session:
+        remaining = await RedisInventoryService(session).reserve_many({1: 1})
+    assert remaining == {1: STOCK + 3 - 1}
+
+
+async def test_failed_guard_returns_reserved_stock(db, products, redis):
+    async with db() as session:
+        inventory = RedisInventoryService(session)
+        with pytest.raises(RuntimeError):
+            async with inventory.guard():
+                await inventory.reserve_many({1: 4, 2: 1})
+                await inventory.release_many({3: 2})
+                raise RuntimeError()
+        # Seeds product 3 from Postgres plus the net pending delta
+        await inventory.reserve_many({3: 1})
+
+    counters = inventory.counters
+    assert int(await redis.get(counters.counter_key(1))) == STOCK
+    assert int(await redis.get(counters.counter_key(2))) == STOCK
+    assert int(await redis.get(counters.counter_key(3))) == STOCK - 1
@@ -0,0 +1,24 @@
+import orjson
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cached_pages_keep_next_cursor(db, products, client, monkeypatch):
+    first = await client.get("/api/products/", params={"limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    last = await client.get("/api/products/", params={"limit": 2, "cursor": cursor})
+    assert "X-Next-Cursor" not in last.headers
+
+    def no_decoding(data):
+        raise AssertionError("cached page was decoded")
+
+    # Cache hits are served as stored, cursor included
+    monkeypatch.setattr(orjson, "loads", no_decoding)
+    cached_first = await client.get("/api/products/", params={"limit": 2})
+    cached_last = await client.get("/api/products/", params={"limit": 2, "cursor": cursor})
+
+    assert cached_first.content == first.content
+    assert cached_first.headers["X-Next-Cursor"] == cursor
+    assert cached_last.content == last.content
+    assert "X-Next-Cursor" not in cached_last.headers
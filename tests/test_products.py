@@ -0,0 +1,18 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_bulk_update_lists_rows_that_change_nothing(db, products, client):
+    response = await client.patch("/api/products/bulk", json=[
+        {"id": 1, "price": 9.5},
+        {"id": 2},
+        {"id": 3, "price": 5.0, "name": "Product 3"},
+        {"id": 99, "price": 1.0},
+    ])
+
+    result = response.json()
+    assert result["items"] == [{"index": 0, "id": 1}]
+    assert result["unchanged"] == [{"index": 1, "id": 2}, {"index": 2, "id": 3}]
+    assert [error["index"] for error in result["errors"]] == [3]
+    assert (await client.get("/api/products/1")).json()["price"] == 9.5
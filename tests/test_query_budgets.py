@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import func, select
+
+from app import instrumentation
+from app.instrumentation import QueryBudgetExceeded, RequestStats, check_query_budget, query_budget
+from app.models import OrderModel, ProductModel
+from app.query_budgets import QUERY_BUDGETS, QueryBudget
+from app.services.inventory_service import InventoryService
+from tests.conftest import STOCK
+
+pytestmark = pytest.mark.anyio
+
+ITEMS = [{"product_id": id, "quantity": 1} for id in (1, 2, 3)]
+
+
+@pytest.fixture
+def reserve_one_by_one(monkeypatch):
+    """Take stock with one UPDATE per product: an N+1 on POST /api/orders/."""
+    reserve_many = InventoryService.reserve_many
+
+    async def reserve_each(self, quantities):
+        remaining = {}
+        for product_id, quantity in quantities.items():
+            remaining.update(await reserve_many(self, {product_id: quantity}))
+        return remaining
+
+    monkeypatch.setattr(InventoryService, "reserve_many", reserve_each)
+    monkeypatch.setitem(QUERY_BUDGETS, ("POST", "/api/orders/"), QueryBudget(None, repeats=2))
+
+
+async def test_routes_stay_within_budgets(db, products, client):
+    with query_budget() as watch:
+        response = await client.post("/api/orders/", json={"user_id": 1, "items": ITEMS[:2]})
+        order_id = response.json()["id"]
+        await client.put(f"/api/orders/{order_id}", json={"items": ITEMS[1:]})
+        await client.get("/api/orders/")
+        await client.get(f"/api/orders/{order_id}")
+        await client.delete(f"/api/orders/{order_id}")
+        await client.get("/api/products/")
+        await client.get("/api/products/2")
+        await client.get("/api/products/search", params={"q": "Product"})
+        await client.put("/api/products/2", json={"price": 7.5})
+
+    checked = {(method, route) for method, route, _ in watch.requests}
+    assert checked == {
+        ("POST", "/api/orders/"),
+        ("PUT", "/api/orders/{order_id}"),
+        ("GET", "/api/orders/"),
+        ("GET", "/api/orders/{order_id}"),
+        ("DELETE", "/api/orders/{order_id}"),
+        ("GET", "/api/products/"),
+        ("GET", "/api/products/{product_id}"),
+        ("GET", "/api/products/search"),
+        ("PUT", "/api/products/{product_id}"),
+    }
+
+
+async def test_repeated_statements_are_flagged(db, products, client, reserve_one_by_one):
+    with pytest.raises(QueryBudgetExceeded, match="POST /api/orders/: 3x UPDATE products"):
+        with query_budget():
+            response = await client.post("/api/orders/", json={"user_id": 1, "items": ITEMS})
+            assert response.status_code == 200
+
+
+async def test_raise_mode_fails_before_commit(db, products, client, reserve_one_by_one, monkeypatch):
+    monkeypatch.setattr(instrumentation, "QUERY_BUDGET_MODE", "raise")
+
+    with pytest.raises(QueryBudgetExceeded):
+        await client.post("/api/orders/", json={"user_id": 1, "items": ITEMS})
+
+    async with db() as session:
+        assert await session.scalar(select(func.count()).select_from(OrderModel)) == 0
+        assert await session.scalar(
+            select(ProductModel.quantity).where(ProductModel.id == 1)
+        ) == STOCK
+
+
+def test_raise_mode_only_logs_committed_requests(monkeypatch):
+    monkeypatch.setattr(instrumentation, "QUERY_BUDGET_MODE", "raise")
+    stats = RequestStats("POST", {})
+    stats.db_queries = 100
+
+    stats.committed = True
+    check_query_budget("POST", "/api/orders/", stats)
+
+    stats.committed = False
+    with pytest.raises(QueryBudgetExceeded):
+        check_query_budget("POST", "/api/orders/", stats)
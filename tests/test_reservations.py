@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models import ProductModel, ReservationModel
+from app.services.reservation_service import ReservationService
+from tests.conftest import STOCK
+
+pytestmark = pytest.mark.anyio
+
+
+async def stock(db, product_id: int) -> int:
+    async with db() as session:
+        return await session.scalar(
+            select(ProductModel.quantity).where(ProductModel.id == product_id)
+        )
+
+
+async def reserve_expired(db, client, count: int) -> list[int]:
+    ids = []
+    for _ in range(count):
+        response = await client.post(
+            "/api/reservations/", json={"user_id": 1, "product_id": 1, "quantity": 2}
+        )
+        ids.append(response.json()["id"])
+    async with db() as session, session.begin():
+        await session.execute(
+            update(ReservationModel).values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+        )
+    return ids
+
+
+async def sweep(db) -> int:
+    async with db() as session:
+        return await ReservationService(session).release_expired(100)
+
+
+async def test_sweeper_skips_reservation_being_cancelled(db, products, client):
+    [reservation_id] = await reserve_expired(db, client, 1)
+
+    async with db() as session, session.begin():
+        await ReservationService(session).get_for_update(reservation_id)
+        assert await sweep(db) == 0
+
+    response = await client.delete(f"/api/reservations/{reservation_id}")
+    assert response.status_code == 200
+    assert await stock(db, 1) == STOCK
+
+
+async def test_cancel_racing_sweeper_releases_stock_once(db, products, client):
+    ids = await reserve_expired(db, client, 4)
+
+    results = await asyncio.gather(
+        sweep(db), *(client.delete(f"/api/reservations/{id}") for id in ids)
+    )
+
+    released, responses = results[0], results[1:]
+    cancelled = sum(response.status_code == 200 for response in responses)
+    assert released + cancelled == len(ids)
+    assert all(response.status_code in (200, 404) for response in responses)
+    assert await stock(db, 1) == STOCK
@@ -0,0 +1,26 @@
+import argparse
+from collections import Counter
+
+from app.cli.seed import Seeder
+
+ARGS = dict(
+    seed=7, categories=3, users=20, products=50, orders=10, reservations=400,
+    max_items=3, product_skew=1.1, user_skew=1.2, expired_ratio=0.3, password="password",
+)
+
+
+def test_reserved_units_are_taken_from_stock():
+    planned = Seeder(argparse.Namespace(**ARGS))
+    planned.plan_reservations()
+    unplanned = Seeder(argparse.Namespace(**ARGS))
+
+    held = Counter()
+    for _, _, product_id, quantity, _ in planned.reservations(1, ARGS["reservations"] + 1):
+        held[product_id] += quantity
+    assert planned.reserved[1:] == [held[id] for id in range(1, ARGS["products"] + 1)]
+
+    for with_reservations, without in zip(
+        planned.products(1, ARGS["products"] + 1), unplanned.products(1, ARGS["products"] + 1)
+    ):
+        id, quantity, stock = with_reservations[0], with_reservations[4], without[4]
+        assert quantity == max(stock, held[id]) - held[id]
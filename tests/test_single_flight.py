@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.config import DATABASE_URL
+from app.database.database import engine
+from app.database.replicas import Replica, replica_router
+from app.services.category_service import CategoryService
+from app.services.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_waiter_takes_over_when_leader_is_cancelled():
+    flight, release, calls = SingleFlight(), asyncio.Event(), []
+
+    async def loader():
+        calls.append(1)
+        await release.wait()
+        return len(calls)
+
+    leader = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await waiter == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+async def test_cancelled_waiter_leaves_the_call_running():
+    flight, release = SingleFlight(), asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", loader))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await leader == "value"
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+
+async def test_primary_reads_do_not_share_replica_loads(redis, monkeypatch):
+    replica = create_async_engine(DATABASE_URL)
+    monkeypatch.setattr(replica_router, "replicas", [Replica("replica0", replica)])
+    release = asyncio.Event()
+
+    def loader(source):
+        async def load():
+            await release.wait()
+            return source
+        return load
+
+    on_replica = CategoryService(AsyncSession(bind=replica))
+    on_primary = CategoryService(AsyncSession(bind=engine))
+    from_replica = asyncio.create_task(on_replica.load_through("key", loader("replica")))
+    await asyncio.sleep(0)
+    from_primary = asyncio.create_task(on_primary.load_through("key", loader("primary")))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await from_replica == "replica"
+    assert await from_primary == "primary"
+    await replica.dispose()
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import select
+
+from app.models import CategoryModel
+from app.schemas.categories import CategoryCreate, CategoryUpdate
+from app.services.category_service import CategoryService
+
+pytestmark = pytest.mark.anyio
+
+
+async def categories(db) -> list[str]:
+    async with db() as session:
+        return list(await session.scalars(select(CategoryModel.name).order_by(CategoryModel.id)))
+
+
+async def test_cache_changes_apply_on_commit(db, redis):
+    async with db() as session:
+        service = CategoryService(session)
+        async with service.unit_of_work():
+            category = await service.create(CategoryCreate(name="Books"))
+            await service.update(category.id, CategoryUpdate(name="Comics"))
+            cache_key = service.get_cache_key(id=category.id)
+            # Nothing is committed or cached until the outer block ends
+            assert await categories(db) == []
+            assert not await redis.exists(cache_key)
+
+    assert await categories(db) == ["Comics"]
+    assert await service.cache_get(cache_key) == {"id": category.id, "name": "Comics"}
+
+
+async def test_cache_changes_drop_on_rollback(db, redis):
+    async with db() as session:
+        service = CategoryService(session)
+        with pytest.raises(RuntimeError):
+            async with service.unit_of_work():
+                category = await service.create(CategoryCreate(name="Books"))
+                cache_key = service.get_cache_key(id=category.id)
+                raise RuntimeError()
+
+    assert await categories(db) == []
+    assert not await redis.exists(cache_key)
+    assert not await redis.exists(service.get_generation_key())